@@ -5,6 +5,7 @@ logger = logging.getLogger("CustomLogger")
 # from clatr.data.data_processing import calc_props, get_most_common
 from infoscopy.nlp_utils.data_processing import calc_props, get_most_common
 from clatr.analyses.ngrams import compute_ngrams
+from clatr.utils.profiling import profiled
 
 
 SQL_PROBLEM_CHARS = {
@@ -30,6 +31,7 @@ def sanitize_character(c: str) -> str:
         return f"_U+{ord(c):04X}_"  # Convert to Unicode representation
     return c
 
+@profiled
 def count_graphemes(text):
     """
     Count various types of graphemes in the given text, handling potential SQL-related character issues.
@@ -1,21 +1,27 @@
 import numpy as np
+from math import log, sqrt
 from collections import Counter
 import logging
 logger = logging.getLogger("CustomLogger")
-# from clatr.utils.NLPmodel import NLPmodel
-from infoscopy.nlp_utils.NLPmodel import NLPmodel
-from lexicalrichness import LexicalRichness
-from wordfreq import word_frequency, zipf_frequency
 # from clatr.data.data_processing import get_most_common
 from infoscopy.nlp_utils.data_processing import get_most_common
 from readability import Readability
 import textstat as tx
 from clatr.analyses.ngrams import compute_ngrams
+from clatr.analyses import richness
+from clatr.utils.profiling import profiled
+from clatr.utils.WordFreqCache import WordFreqCache
 
 
-def calculate_frequencies(doc, label):
+@profiled
+def calculate_frequencies(doc, label, freq_cache=None):
     """
     Compute word frequency, zipf frequency, and weighted frequencies.
+
+    Args:
+        doc (spacy.tokens.Doc): The text to analyze.
+        label (str): Prefix for the output keys.
+        freq_cache (WordFreqCache): Word frequency cache, or None for the process default.
     """
     tokens = [token.text for token in doc if token.is_alpha]
 
@@ -24,11 +30,10 @@ def calculate_frequencies(doc, label):
         return {}
 
     total_words = len(tokens)
-    unique_words = set(tokens)
+    counts = Counter(tokens)
+    type_freqs = (freq_cache or WordFreqCache()).lookup(counts)
     freqs = {
-        w: (word_frequency(w, 'en', wordlist='best'),
-            zipf_frequency(w, 'en', wordlist='best'),
-            tokens.count(w)) for w in unique_words
+        w: (freq, zipf, count) for (w, count), (freq, zipf) in zip(counts.items(), type_freqs)
     }
     
     word_frequencies = [freqs[w][0] for w in tokens]
@@ -36,7 +41,7 @@ def calculate_frequencies(doc, label):
     zipf_frequencies = [freqs[w][1] for w in tokens]
     weighted_zipfs = [freqs[w][1] * (freqs[w][2] / len(tokens)) for w in freqs]
 
-    rare_words = {freqs.get(word, (0, 0, 0))[1]:word for word in tokens if freqs.get(word, (0, 0, 0))[1] <= 3}
+    rare_words = {zipf: w for w, (_, zipf, _) in freqs.items() if zipf <= 3}
 
     func_data = {
         f"{label}_rare_words_count": len(rare_words),
@@ -51,16 +56,22 @@ def calculate_frequencies(doc, label):
         f"{label}_var_weighted_zipf_freq": np.var(weighted_zipfs) if len(weighted_zipfs) > 1 else 0,
     }
 
-    func_data.update(get_most_common(Counter(tokens), 5, f"word_{label}"))
+    func_data.update(get_most_common(counts, 5, f"word_{label}"))
 
     return func_data
 
+@profiled
 def compute_lexical_richness(doc, label):
     """
     Compute lexical richness measures for a given text.
 
+    Measures are computed from the Doc's lowercased alphabetic tokens (see
+    `clatr.analyses.richness`), with the same definitions and settings as
+    lexicalrichness.
+
     Args:
-        text (str): The text to analyze.
+        doc (spacy.tokens.Doc): The text to analyze.
+        label (str): Prefix for the output keys.
 
     Returns:
         dict: A dictionary containing lexical richness measures.
@@ -87,39 +98,40 @@ def compute_lexical_richness(doc, label):
             func_data[f"{label}_num_stop_words"] = len(stop_words)
             func_data[f"lexical_density"] = (len(tokens)-len(stop_words))/len(tokens)
 
-        lex = LexicalRichness(doc.text)
+        ids, counts = richness.alpha_token_ids(doc)
+        words, terms = len(ids), len(counts)
         more_func_data = {
-            f"num_words_{label}_textblob": lex.words,
-            f"{label}_unique_word_count_spacy": lex.terms,
-            f"{label}_ttr": lex.ttr,
-            f"{label}_rttr": lex.rttr,
-            f"{label}_cttr": lex.cttr,
-            f"{label}_msttr": lex.msttr(segment_window=min(25, lex.words-1)),
-            f"{label}_mattr": lex.mattr(window_size=min(25, lex.words-1)),
-            f"{label}_mtld": lex.mtld(threshold=0.72),
-            f"{label}_hdd": lex.hdd(draws=min(42, lex.words)),
-            f"{label}_herdan": lex.Herdan,
-            f"{label}_summer": lex.Summer,
-            f"{label}_maas": lex.Maas,
-            f"{label}_yulek": lex.yulek,
-            f"{label}_herdanvm": lex.herdanvm,
-            f"{label}_simpsond": lex.simpsond,
+            f"num_words_{label}_textblob": words,
+            f"{label}_unique_word_count_spacy": terms,
+            f"{label}_ttr": terms / words,
+            f"{label}_rttr": terms / sqrt(words),
+            f"{label}_cttr": terms / sqrt(2 * words),
+            f"{label}_msttr": richness.msttr(ids, min(25, words-1)),
+            f"{label}_mattr": richness.mattr(ids, min(25, words-1)),
+            f"{label}_mtld": richness.mtld(ids, threshold=0.72),
+            f"{label}_hdd": richness.hdd(counts, draws=min(42, words)),
+            f"{label}_herdan": log(terms) / log(words),
+            f"{label}_summer": log(log(terms)) / log(log(words)),
+            f"{label}_maas": (log(words) - log(terms)) / (log(words) ** 2),
+            f"{label}_yulek": richness.yule_k(counts),
+            f"{label}_herdanvm": richness.herdan_vm(counts),
+            f"{label}_simpsond": richness.simpson_d(counts),
         }
 
         func_data.update(more_func_data)
         
         try:
-            yulei = lex.yulei
+            yulei = richness.yule_i(counts)
             if yulei != np.inf:
-                func_data.update({f"{label}_yulei": lex.yulei})
+                func_data.update({f"{label}_yulei": yulei})
         except Exception as e:
             logger.warning(f"Error in a yulei calculation: {e}")
         try:
-            func_data.update({f"{label}_dugast": lex.Dugast})
+            func_data.update({f"{label}_dugast": richness.dugast(words, terms)})
         except Exception as e:
             logger.warning(f"Error in dugast calculation: {e}")
         try:    
-            func_data.update({f"{label}_vocd": lex.vocd()})  
+            func_data.update({f"{label}_vocd": richness.vocd(ids)})  
         except Exception as e:
             logger.warning(f"Error in vocd calculation: {e}")      
 
@@ -129,6 +141,7 @@ def compute_lexical_richness(doc, label):
         logger.error(f"Error computing lexical richness: {e}")
         return {}
 
+@profiled
 def process_named_entities(doc, num):
     """
     Extract named entity information including counts, types, and most common entities.
@@ -157,6 +170,7 @@ def process_named_entities(doc, num):
 def safe_join(seq):
     return ", ".join(str(x) for x in seq)
 
+@profiled
 def calc_readability(doc):
     """
     Calculates various readability metrics for a given spaCy Doc object.
@@ -264,33 +278,29 @@ def analyze_lexicon(PM, sample_data):
     """
     try:
         results = PM.sections["lexicon"].init_results_dict()
-        
-        NLP = NLPmodel()
-        nlp = NLP.get_nlp()
+        freq_cache = PM.get_word_freq_cache()
 
         if PM.sentence_level:
             if not isinstance(sample_data, list):
                 raise ValueError("Expected a list of sentence dicts for sentence-level analysis.")
             
-            doc_cleaned = ""
-            doc_tokenized = ""
             doc_id = sample_data[0].get("doc_id")
+            cleaned_docs = PM.get_sent_docs(sample_data, ("cleaned",))
+            semantic_docs = PM.get_sent_docs(sample_data, ("semantic",))
             
-            for sent in sample_data:
+            for sent, cleaned_doc, semantic_doc in zip(sample_data, cleaned_docs, semantic_docs):
                 func_data = {}
                 sent_id = sent.get("sent_id")
-                cleaned = sent.get("cleaned", "")
-                semantic = sent.get("semantic", "")
                 sent_data_base = {"doc_id": doc_id, "sent_id": sent_id}
                 
-                doc = nlp(cleaned)
+                doc = cleaned_doc
                 tokens = [token.text for token in doc if token.is_alpha]
-                func_data["freqs_cleaned"] = calculate_frequencies(doc, "cleaned")
+                func_data["freqs_cleaned"] = calculate_frequencies(doc, "cleaned", freq_cache)
                 func_data["richness_cleaned"] = compute_lexical_richness(doc, "cleaned")
                 func_data["named_entities"] = process_named_entities(doc, 3)
 
-                doc = nlp(semantic)
-                func_data["freqs_tokenized"] = calculate_frequencies(doc, "semantic")
+                doc = semantic_doc
+                func_data["freqs_tokenized"] = calculate_frequencies(doc, "semantic", freq_cache)
                 func_data["richness_tokenized"] = compute_lexical_richness(doc, "semantic")
 
                 summary_data, ngram_data = compute_ngrams(PM, tokens, sent_data_base, "lex", "sent")
@@ -306,33 +316,31 @@ def analyze_lexicon(PM, sample_data):
                         sent_ngram_data = sent_data_base.copy()
                         sent_ngram_data.update(row_data)
                         results[f"{table}_sent"].append(sent_ngram_data)                        
-                
-                doc_cleaned += " " + sent["cleaned"]
-                doc_tokenized += " " + sent["semantic"] + "."
             
-            doc_cleaned = doc_cleaned.strip()
-            doc_tokenized = doc_tokenized.strip()
+            # Document-level Docs are assembled from the sentence parses.
+            cleaned_doc = PM.get_joined_doc(sample_data, ("cleaned",))
+            semantic_doc = PM.get_joined_doc(sample_data, ("semantic",))
         
         else:
             if not isinstance(sample_data, dict):
                 raise ValueError("Expected a single dict for document-level analysis.")
             
-            doc_cleaned = sample_data.get("cleaned", "")
-            doc_tokenized = sample_data.get("semantic", "")
             doc_id = sample_data.get("doc_id")
+            cleaned_doc = PM.get_doc(doc_id, sample_data.get("cleaned", ""), "cleaned")
+            semantic_doc = PM.get_doc(doc_id, sample_data.get("semantic", ""), "semantic")
 
         func_data = {}
         doc_data_base = {"doc_id": doc_id}
             
-        doc = nlp(doc_cleaned)
+        doc = cleaned_doc
         tokens = [token.text for token in doc if token.is_alpha]
-        func_data["freqs_cleaned"] = calculate_frequencies(doc, "cleaned")
+        func_data["freqs_cleaned"] = calculate_frequencies(doc, "cleaned", freq_cache)
         func_data["richness_cleaned"] = compute_lexical_richness(doc, "cleaned")
         func_data["named_entities"] = process_named_entities(doc, 10)
         func_data["readability"] = calc_readability(doc)
 
-        doc = nlp(doc_tokenized)
-        func_data["freqs_tokenized"] = calculate_frequencies(doc, "semantic")
+        doc = semantic_doc
+        func_data["freqs_tokenized"] = calculate_frequencies(doc, "semantic", freq_cache)
         func_data["richness_tokenized"] = compute_lexical_richness(doc, "semantic")
 
         summary_data, ngram_data = compute_ngrams(PM, tokens, doc_data_base, "lex", "doc")
@@ -1,21 +1,67 @@
 import numpy as np
-import language_tool_python
+from bisect import bisect_right
 from collections import Counter
 import logging
 logger = logging.getLogger("CustomLogger")
-# from clatr.utils.NLPmodel import NLPmodel
-from infoscopy.nlp_utils.NLPmodel import NLPmodel
 # from clatr.data.data_processing import get_most_common
 from infoscopy.nlp_utils.data_processing import get_most_common
+from clatr.utils.profiling import profiled
 
 
-def apply_language_tool(doc, num):
+PARAGRAPH_SEP = "\n\n"
+
+# Text-level rules comparing consecutive sentences or paragraphs, which cannot
+# fire on a sentence checked alone. Other text-level rules (e.g. word coherency,
+# unpaired brackets and quotes) look across the whole text and can still count
+# differently in a chunk, which is why chunking is off by default.
+CROSS_PARAGRAPH_RULES = {"PARAGRAPH_REPEAT_BEGINNING_RULE", "ENGLISH_WORD_REPEAT_BEGINNING_RULE"}
+
+
+def chunk_sentences(texts, max_chars):
+    """
+    Groups consecutive sentences into chunks of at most `max_chars` characters,
+    counting the paragraph separators between them.
+
+    A sentence longer than `max_chars` forms its own chunk, and a `max_chars`
+    of 0 puts every sentence in its own chunk.
+
+    Args:
+        texts (list of str): Sentence texts in document order.
+        max_chars (int): Maximum characters per chunk.
+
+    Returns:
+        list of tuple: (first, end) sentence index range of each chunk.
+    """
+    chunks = []
+    length = 0
+    for i, text in enumerate(texts):
+        if chunks and length + len(PARAGRAPH_SEP) + len(text) <= max_chars:
+            chunks[-1] = (chunks[-1][0], i + 1)
+            length += len(PARAGRAPH_SEP) + len(text)
+        else:
+            chunks.append((i, i + 1))
+            length = len(text)
+    return chunks
+
+@profiled
+def apply_language_tool(doc, num, tool, max_chars=0):
     """
     Apply LanguageTool to detect grammar errors in sentences.
 
+    By default each sentence is checked on its own. With `max_chars`, sentences
+    are checked in chunks, each sentence as its own paragraph, so LanguageTool
+    sees the same sentence starts and ends. Matches are mapped back to their
+    sentence by offset; matches that could not occur in a single sentence
+    (spanning a paragraph break, or from rules comparing sentences) are dropped.
+    Rules that look across the whole text can still differ (see
+    CROSS_PARAGRAPH_RULES).
+
     Args:
-        sentences (list): List of sentences.
-        results (dict): Dictionary to store grammar analysis results.
+        doc (spacy.tokens.Doc): Parsed document.
+        num (int): Number of most common rules and categories to report.
+        tool (LanguageToolPool): The run's LanguageTool servers.
+        max_chars (int): Maximum characters sent to LanguageTool per check
+            (0 checks every sentence separately).
 
     Returns:
         dict: Updated results dictionary with grammar error statistics.
@@ -23,26 +69,45 @@ def apply_language_tool(doc, num):
     try:
         results = {}
 
-        tool = language_tool_python.LanguageTool('en-US')
-
         rules = Counter()
         cats = Counter()
         num_matches = []
         error_lengths = []
 
         sentences = [sent for sent in doc.sents]
-
-        for sent in sentences:
-            try:
-                matches = tool.check(sent.text)
-                if matches:
-                    num_matches.append(len(matches))
-                    for m in matches:
-                        rules[m.ruleId] += 1
-                        cats[m.category] += 1
-                        error_lengths.append(m.errorLength)
-            except Exception as e:
-                logger.warning(f"LanguageTool error on sentence: {sent} | Error: {e}")
+        texts = [sent.text for sent in sentences]
+        sent_matches = [[] for _ in sentences]
+
+        chunks = chunk_sentences(texts, max_chars)
+        checked = tool.check_all([PARAGRAPH_SEP.join(texts[first:end]) for first, end in chunks])
+
+        for (first, end), matches in zip(chunks, checked):
+            if isinstance(matches, Exception):
+                logger.warning(f"LanguageTool error on text: {' '.join(texts[first:end])} | Error: {matches}")
+                continue
+
+            # Offsets of the chunk's sentences within the chunk text
+            starts = []
+            offset = 0
+            for text in texts[first:end]:
+                starts.append(offset)
+                offset += len(text) + len(PARAGRAPH_SEP)
+
+            for m in matches:
+                if m.ruleId in CROSS_PARAGRAPH_RULES:
+                    continue
+                i = bisect_right(starts, m.offset) - 1
+                if m.offset + m.errorLength > starts[i] + len(texts[first + i]):
+                    continue
+                sent_matches[first + i].append(m)
+
+        for matches in sent_matches:
+            if matches:
+                num_matches.append(len(matches))
+                for m in matches:
+                    rules[m.ruleId] += 1
+                    cats[m.category] += 1
+                    error_lengths.append(m.errorLength)
 
         # Compute sentence-level statistics
         results['num_lgtool_errors'] = sum(num_matches)
@@ -65,8 +130,6 @@ def apply_language_tool(doc, num):
             results[f"num_category_{category}"] = count
             results[f"prop_category_{error}"] = count / results['num_lgtool_errors'] if results['num_lgtool_errors'] > 0 else None
 
-        tool.close()
-
         logger.info(f"LanguageTool analysis completed. Total errors: {results['num_lgtool_errors']}")
         return results
 
@@ -87,22 +150,17 @@ def analyze_mechanics(PM, sample_data):
     try:
         results = PM.sections["mechanics"].init_results_dict()
 
-        NLP = NLPmodel()
-        nlp = NLP.get_nlp()
-
         if isinstance(sample_data, list):
             sample_data = sample_data[0]
 
-        if sample_data.get("cleaned_phon", ""):
-            doc_cleaned = sample_data.get("cleaned_phon", "")
-        else:
-            doc_cleaned = sample_data.get("cleaned", "")
+        field = "cleaned_phon" if sample_data.get("cleaned_phon", "") else "cleaned"
+        doc_cleaned = sample_data.get(field, "")
         
         doc_id = sample_data.get("doc_id")
-        doc = nlp(doc_cleaned)
+        doc = PM.get_doc(doc_id, doc_cleaned, field, sample_data.get("sent_id"))
 
         func_data = {}
-        func_data["lg_tool"] = apply_language_tool(doc, 5)
+        func_data["lg_tool"] = apply_language_tool(doc, 5, PM.get_language_tool(), PM.lgtool_chunk_chars)
         doc_data_base = {"doc_id": doc_id}
         for table, row_data in func_data.items():
             doc_data = doc_data_base.copy()
@@ -2,11 +2,10 @@ import numpy as np
 from collections import Counter
 import logging
 logger = logging.getLogger("CustomLogger")
-# from clatr.utils.NLPmodel import NLPmodel
-from infoscopy.nlp_utils.NLPmodel import NLPmodel
 # from clatr.data.data_processing import calc_props, get_most_common
 from infoscopy.nlp_utils.data_processing import calc_props, get_most_common
 from clatr.analyses.ngrams import compute_ngrams
+from clatr.utils.profiling import profiled
 
 
 def estimate_mlu(doc):
@@ -41,6 +40,7 @@ def estimate_mlu(doc):
     mlu = total_morphemes / len(sents)
     return round(mlu, 2)
 
+@profiled
 def analyze_spacy_features(doc, num, feature_type="POS"):
     """
     Generalized function to analyze POS tags or dependency parsing features in a given `spaCy` doc.
@@ -93,6 +93,7 @@ def analyze_spacy_features(doc, num, feature_type="POS"):
 
     return func_data
 
+@profiled
 def morphological_analysis(doc, num):
     """
     Analyzes morphological features in a given `spaCy` doc.
@@ -144,21 +145,16 @@ def analyze_morphology(PM, sample_data):
     try:
         results = PM.sections["morphology"].init_results_dict()
 
-        NLP = NLPmodel()
-        nlp = NLP.get_nlp()
-
         if PM.sentence_level:
             if not isinstance(sample_data, list):
                 raise ValueError("Expected a list of sentence dicts for sentence-level analysis.")
             
-            doc_cleaned = ""
             doc_id = sample_data[0].get("doc_id")            
+            sent_docs = PM.get_sent_docs(sample_data, ("cleaned",))
             
-            for sent in sample_data:
+            for sent, doc in zip(sample_data, sent_docs):
                 sent_id = sent.get("sent_id")
-                cleaned = sent.get("cleaned", "")
 
-                doc = nlp(cleaned)
                 sent_data_base = {"doc_id": doc_id, "sent_id": sent_id}
                 func_data = morphological_analysis(doc, 5)
                 func_data.update(analyze_spacy_features(doc, 5, "POS"))
@@ -178,19 +174,17 @@ def analyze_morphology(PM, sample_data):
                         sent_ngram_data.update(row_data)
                         results[f"{table}_sent"].append(sent_ngram_data)                        
 
-                doc_cleaned += " " + cleaned
-
-            doc_cleaned = doc_cleaned.strip()
+            # The document-level Doc is assembled from the sentence parses.
+            doc = PM.get_joined_doc(sample_data, ("cleaned",))
 
         else:
             if not isinstance(sample_data, dict):
                 raise ValueError("Expected a single dict for document-level analysis.")
             
-            doc_cleaned = sample_data.get("cleaned", "")
             doc_id = sample_data.get("doc_id")
+            doc = PM.get_doc(doc_id, sample_data.get("cleaned", ""), "cleaned")
 
         doc_data_base = {"doc_id": doc_id}
-        doc = nlp(doc_cleaned)
         func_data = {}
         func_data.update(morphological_analysis(doc, 10))
         func_data.update(analyze_spacy_features(doc, 10, "POS"))
@@ -1,11 +1,68 @@
-from collections import Counter
+import numpy as np
 from math import log2
 from typing import List, Dict
+from clatr.utils.profiling import profiled
 
+INT64_MAX = np.iinfo(np.int64).max
+OTHER_NGRAM = "__other__"
+
+
+def encode_sequence(sequence: List[str]):
+    """
+    Encodes a sequence as integer ids in order of first appearance.
+
+    Returns:
+        tuple: (np.ndarray of ids, number of distinct items)
+    """
+    index = {}
+    ids = np.fromiter((index.setdefault(item, len(index)) for item in sequence),
+                      dtype=np.int64, count=len(sequence))
+    return ids, len(index)
+
+def count_ngram_orders(ids: np.ndarray, vocab_size: int, max_n: int):
+    """
+    Counts the n-grams of an encoded sequence for every order from 1 to `max_n`.
+
+    Each n-gram is keyed by a rolling base-`vocab_size` integer built from the
+    keys of order n-1. If the keys could overflow int64, the n-gram windows
+    are counted as rows instead.
+
+    Yields:
+        tuple: (n, start index of each distinct n-gram's first occurrence,
+            counts), both in order of first occurrence as a Counter would list them.
+    """
+    keys = ids
+    for n in range(1, max_n + 1):
+        num_windows = len(ids) - n + 1
+        if num_windows <= 0:
+            continue
+
+        if n > 1 and keys is not None:
+            fits = vocab_size ** n - 1 <= INT64_MAX
+            keys = keys[:num_windows] * vocab_size + ids[n - 1:] if fits else None
+
+        if keys is not None:
+            _, first_idx, counts = np.unique(keys, return_index=True, return_counts=True)
+        else:
+            windows = np.lib.stride_tricks.sliding_window_view(ids, n)
+            _, first_idx, counts = np.unique(windows, axis=0, return_index=True, return_counts=True)
+
+        order = np.argsort(first_idx)
+        yield n, first_idx[order], counts[order]
+
+@profiled
 def compute_ngrams(PM, sequence: List[str], row_base: Dict, prefix: str, gran: str) -> Dict[str, List[Dict]]:
     """
     Computes n-grams and associated statistics for a given sequence.
 
+    The sequence is encoded to integer ids once and all orders are counted
+    from it; rows and statistics match counting tuples with a Counter.
+
+    Per-table rows can be limited with the `ngram_top_k` and `ngram_min_count`
+    options, optionally folding the dropped n-grams into one "__other__" row
+    (`ngram_other_bucket`). Summary statistics always cover every n-gram, as
+    do the document-level counts added to the corpus sketch (`corpus_ngrams`).
+
     Args:
         sequence (List[str]): Input sequence (graphemes, phonemes, etc.).
         row_base (Dict): Metadata row (doc_id, sent_id, etc.).
@@ -13,7 +70,7 @@ def compute_ngrams(PM, sequence: List[str], row_base: Dict, prefix: str, gran: s
         gran (str): Granularity ('doc' or 'sent').
 
     Returns:
-        Dict[str, List[Dict]]: 
+        Dict[str, List[Dict]]:
             ngram_data: Summary + per-n-gram table data.
     """
     ngram_data = {}
@@ -21,21 +78,22 @@ def compute_ngrams(PM, sequence: List[str], row_base: Dict, prefix: str, gran: s
     summary_row = row_base.copy()
     current_ngram_id = PM.ngram_id_doc if gran == "doc" else PM.ngram_id_sent
 
-    for n in range(1, PM.ngrams + 1):
-        ngram_list = [tuple(sequence[i:i+n]) for i in range(len(sequence)-n+1)]
-        if not ngram_list:
-            continue
+    ids, vocab_size = encode_sequence(sequence)
 
-        ngram_counts = Counter(ngram_list)
-        total_ngrams = sum(ngram_counts.values())
-        unique_ngrams = len(ngram_counts)
+    for n, first_idx, counts in count_ngram_orders(ids, vocab_size, PM.ngrams):
+        count_list = counts.tolist()  # In order of first occurrence
+        total_ngrams = sum(count_list)
+        unique_ngrams = len(count_list)
 
-        # Entropy
-        probs = [count / total_ngrams for count in ngram_counts.values()]
+        # Entropy, summed in the same order as over a Counter's values
+        probs = [count / total_ngrams for count in count_list]
         entropy = -sum(p * log2(p) for p in probs) if total_ngrams > 0 else 0
 
+        # Most common first, ties in order of first occurrence
+        ranked = np.argsort(-counts, kind="stable")
+        sorted_counts = counts[ranked].tolist()
+
         # Coverage metrics
-        sorted_counts = sorted(ngram_counts.values(), reverse=True)
         coverage3 = sum(sorted_counts[:3]) / total_ngrams if total_ngrams >= 3 else sum(sorted_counts) / total_ngrams
         coverage5 = sum(sorted_counts[:5]) / total_ngrams if total_ngrams >= 5 else sum(sorted_counts) / total_ngrams
 
@@ -49,22 +107,48 @@ def compute_ngrams(PM, sequence: List[str], row_base: Dict, prefix: str, gran: s
         summary_row[f"coverage3_n{n}gram"] = coverage3
         summary_row[f"coverage5_n{n}gram"] = coverage5
 
-        # N-gram data table
+        # N-gram data table, most common first, pruned to the configured limits
         table_name = f"{prefix}_n{n}grams"
+        if gran == "doc" and PM.ngram_sketch is not None:
+            ngrams = ["_".join(sequence[start:start + n]) for start in first_idx.tolist()]
+            PM.ngram_sketch.update(table_name, ngrams, count_list)
+
+        top_k, min_count, other_bucket = PM.get_ngram_limits(table_name, prefix)
+        num_kept = unique_ngrams
+        if min_count is not None:
+            num_kept = int(np.count_nonzero(counts >= min_count))
+        if top_k is not None:
+            num_kept = min(num_kept, int(top_k))
+
         records = []
-        for rank, (ngram, count) in enumerate(ngram_counts.most_common(), start=1):
+        kept_starts = first_idx[ranked[:num_kept]].tolist()
+        for rank, (start, count) in enumerate(zip(kept_starts, sorted_counts), start=1):
             row_data = row_base.copy()
             row_data.update({
                 "ngram_id": current_ngram_id,
                 "n": n,
-                "ngram": "_".join(ngram),
+                "ngram": "_".join(sequence[start:start + n]),
                 "count": count,
                 "proportion": count / total_ngrams,
                 "rank": rank
             })
             records.append(row_data)
             current_ngram_id += 1
-        
+
+        if other_bucket and num_kept < unique_ngrams:
+            other_count = sum(sorted_counts[num_kept:])
+            row_data = row_base.copy()
+            row_data.update({
+                "ngram_id": current_ngram_id,
+                "n": n,
+                "ngram": OTHER_NGRAM,
+                "count": other_count,
+                "proportion": other_count / total_ngrams,
+                "rank": num_kept + 1
+            })
+            records.append(row_data)
+            current_ngram_id += 1
+
         ngram_data[table_name] = records
 
     # Insert summary row as first entry in ngram_data
@@ -1,14 +1,13 @@
 import re
 import numpy as np
-from g2p_en import G2p
 from collections import Counter
 import logging
 logger = logging.getLogger("CustomLogger")
-# from clatr.utils.NLPmodel import NLPmodel
-from infoscopy.nlp_utils.NLPmodel import NLPmodel
+from clatr.utils.PronunciationCache import PronunciationCache
 # from clatr.utils.OutputManager import OutputManager
 # from clatr.data.data_processing import calc_props, get_most_common
 from infoscopy.nlp_utils.data_processing import calc_props, get_most_common
+from clatr.utils.profiling import profiled
 
 # def create_phoneme_tables():
 #     OM = OutputManager()
@@ -43,12 +42,70 @@ PHONETIC_FEATURES_ARPABET = {
     "voiced": {"B", "D", "G", "V", "DH", "Z", "ZH", "JH", "M", "N", "NG", "L", "R", "W", "Y"},
 }
 
-def analyze_phonemes(doc):
+ARPABET_SYMBOLS = [
+    "AA", "AE", "AH", "AO", "AW", "AY", "EH", "ER", "EY", "IH", "IY", "OW", "OY", "UH", "UW",
+    "B", "CH", "D", "DH", "F", "G", "HH", "JH", "K", "L", "M", "N", "NG", "P", "R", "S", "SH",
+    "T", "TH", "V", "W", "Y", "Z", "ZH"
+]
+
+class PhonemeTable:
+    """
+    Integer ids for phoneme symbols with their base phoneme and feature bitmask.
+
+    Bit j of a symbol's mask is set if its stress-free form belongs to the
+    j-th feature of PHONETIC_FEATURES_ARPABET. The table is seeded with the
+    stress-marked ARPAbet inventory and grows as new symbols are seen.
+    """
+    def __init__(self, symbols=()):
+        self.ids = {}  # symbol: id
+        self.symbols = []
+        self.is_phoneme = []  # whether the symbol is a word-character string
+        self.base_ids = []  # id of the stress-free base, or -1 if the symbol has no stress digit
+        self.masks = []
+        self.features = list(PHONETIC_FEATURES_ARPABET)
+        for symbol in symbols:
+            self.encode(symbol)
+
+    def encode(self, symbol):
+        """
+        Returns the id of a symbol, adding it to the table if new.
+        """
+        sid = self.ids.get(symbol)
+        if sid is not None:
+            return sid
+
+        sid = len(self.symbols)
+        self.ids[symbol] = sid
+        self.symbols.append(symbol)
+        base = re.sub(r'\d', '', symbol)
+        self.is_phoneme.append(bool(re.match(r'^\w+$', symbol)))
+        self.masks.append(sum(1 << j for j, members in enumerate(PHONETIC_FEATURES_ARPABET.values())
+                              if base in members))
+        # Appended before the base is encoded, which may itself add a row.
+        self.base_ids.append(-1)
+        if re.search(r'\d', symbol):
+            self.base_ids[sid] = self.encode(base)
+        return sid
+
+    def feature_matrix(self):
+        """
+        Returns an (num_symbols, num_features) 0/1 matrix of the feature bitmasks.
+        """
+        masks = np.array(self.masks, dtype=np.int64)
+        return (masks[:, None] >> np.arange(len(self.features))) & 1
+
+PHONEME_TABLE = PhonemeTable(
+    [f"{p}{stress}" for p in ARPABET_SYMBOLS[:15] for stress in "012"] + ARPABET_SYMBOLS
+)
+
+@profiled
+def analyze_phonemes(doc, prons=None):
     """
     Extract phonological features from a given text using ARPAbet.
 
     Args:
-        text (str): Input text.
+        doc (spacy.Doc): Tokenized document.
+        prons (PronunciationCache): Pronunciation cache, or None for the process default.
 
     Returns:
         dict: Dictionary of phoneme counts, phonetic feature proportions, and phoneme-word distributions.
@@ -60,14 +117,20 @@ def analyze_phonemes(doc):
             logger.warning("Not enough tokens to analyze phonology - skipping.")
             return {}
 
-        g2p = G2p()
-        phonemized_tokens = [g2p(t) for t in tokens if t.isalpha()]
+        prons = prons or PronunciationCache()
+        phonemized_tokens = prons.lookup([t for t in tokens if t.isalpha()])
         pt_lengths = [len(pt) for pt in phonemized_tokens]
         unique_pt_lengths = [len(set(pt)) for pt in phonemized_tokens]
         phoneme_list = [p for t in phonemized_tokens for p in t if p != ' ']
-        phoneme_counts = Counter(phoneme_list)
-        total_phonemes = sum(phoneme_counts.values())
-        unique_phonemes = len(phoneme_counts)
+        table = PHONEME_TABLE
+        phoneme_ids = np.array([table.encode(p) for p in phoneme_list], dtype=np.int64)
+        id_counts = np.bincount(phoneme_ids, minlength=len(table.symbols))
+        # Distinct phoneme ids in order of first appearance, as a Counter would list them
+        distinct, first_idx = np.unique(phoneme_ids, return_index=True)
+        order = distinct[np.argsort(first_idx)]
+        phoneme_counts = Counter({table.symbols[i]: int(id_counts[i]) for i in order})
+        total_phonemes = len(phoneme_list)
+        unique_phonemes = len(order)
         
         func_data ={"phoneme_basic_specs":{}, "phoneme_counts":{}, "phoneme_props":{}, "phoneme_commonest":{},
                     "phon_feature_counts":{}, "phon_feature_props":{}, "word_lens_counts":{}, "word_lens_props":{}}
@@ -86,31 +149,27 @@ def analyze_phonemes(doc):
         }
 
         # Individual phoneme counts (including stress-marked versions)
-        total_phoneme_counts = Counter()  # For stress-independent tallies
-        for phoneme, count in phoneme_counts.items():
-            if re.match(r'^\w+$', phoneme):
-                func_data["phoneme_counts"][f"num_{phoneme}"] = count  # Keep stress-marked version
-                if re.search(r'\d', phoneme):
-                    base_phoneme = re.sub(r'\d', '', phoneme)  # Remove stress numbers
-                    # Track stress-independent count
-                    total_phoneme_counts[base_phoneme] += count
+        base_ids = np.array(table.base_ids, dtype=np.int64)
+        base_counts = np.bincount(base_ids[phoneme_ids][base_ids[phoneme_ids] >= 0],
+                                  minlength=len(table.symbols))
+        total_phoneme_ids = {}  # For stress-independent tallies, in order of first appearance
+        for i in order:
+            if table.is_phoneme[i]:
+                func_data["phoneme_counts"][f"num_{table.symbols[i]}"] = int(id_counts[i])  # Keep stress-marked version
+                if table.base_ids[i] >= 0:
+                    total_phoneme_ids.setdefault(table.base_ids[i])
             else:
-                logger.warning(f"Cannot parse '{phoneme}' as phoneme.")
+                logger.warning(f"Cannot parse '{table.symbols[i]}' as phoneme.")
 
         # Add stress-independent phoneme totals
-        for phoneme, count in total_phoneme_counts.items():
-            func_data["phoneme_counts"][f"num_total_{phoneme}"] = count
+        for i in total_phoneme_ids:
+            func_data["phoneme_counts"][f"num_total_{table.symbols[i]}"] = int(base_counts[i])
         
         func_data["phoneme_props"].update(calc_props(func_data["phoneme_counts"], total_phonemes))
 
         # Track phonetic feature counts
-        feature_counts = {feature: 0 for feature in PHONETIC_FEATURES_ARPABET}
-
-        for phoneme, count in phoneme_counts.items():
-            for feature, members in PHONETIC_FEATURES_ARPABET.items():
-                # Remove stress indicator
-                if re.sub(r'\d','',phoneme) in members:
-                    feature_counts[feature] += count
+        feature_totals = id_counts @ table.feature_matrix()[:len(id_counts)]
+        feature_counts = {feature: int(count) for feature, count in zip(table.features, feature_totals)}
 
         # Add phonetic feature counts and proportions
         for feature, count in feature_counts.items():
@@ -132,46 +191,30 @@ def analyze_phonemes(doc):
         logger.error(f"Error in phonological analysis: {e}")
         return {}
 
-def count_syllables(word):
+def count_syllables(word, prons=None):
     """
     Get syllable count and stress pattern for a word using CMU Pronouncing Dictionary.
 
     Args:
         word (str): The word to analyze.
+        prons (PronunciationCache): Pronunciation cache, or None for the process default.
 
     Returns:
         tuple: (syllable count, primary stress count, secondary stress count)
+            Syllables are the maximum over pronunciations, stresses the sum;
+            unknown words count as 1 syllable with no stress info.
     """
-    NLP = NLPmodel()
-    cmu_dict = NLP.get_cmu_dict()
-    # cmu_dict = NLPmodel.get_cmu_dict()
-
-    word = word.lower()
-    
-    if word in cmu_dict:
-        syllable_counts = []
-        primary_stress = 0
-        secondary_stress = 0
-        
-        for pronunciation in cmu_dict[word]:
-            syllables = [p for p in pronunciation if p[-1].isdigit()]
-            syllable_counts.append(len(syllables))
-
-            # Count primary (1) and secondary (2) stress markers
-            primary_stress += sum(1 for p in syllables if "1" in p)
-            secondary_stress += sum(1 for p in syllables if "2" in p)
+    table = (prons or PronunciationCache()).syllable_table
+    return tuple(int(v) for v in table.lookup([word.lower()])[0])
 
-        # Return max syllable count to handle multiple pronunciations
-        return max(syllable_counts), primary_stress, secondary_stress
-    
-    return 1, 0, 0  # Default: unknown words = 1 syllable, no stress info
-
-def analyze_syllables(doc):
+@profiled
+def analyze_syllables(doc, prons=None):
     """
     Analyze syllable structure and stress patterns in a spaCy `Doc`.
 
     Args:
         doc (spacy.Doc): Tokenized document.
+        prons (PronunciationCache): Pronunciation cache, or None for the process default.
 
     Returns:
         dict: Syllable statistics including total count, average, and breakdown by word length.
@@ -184,37 +227,32 @@ def analyze_syllables(doc):
         "total_secondary_stress": 0
     }
 
-    syllable_counts = []
-
-    tokens = [t for t in doc if t.is_alpha]
+    tokens = [t.text.lower() for t in doc if t.is_alpha]  # Ignore punctuation/numbers
 
     if not tokens:
         logger.error(f"No tokens for syllable analysis.")
         return {}
-    
-    for token in tokens:
-        if token.is_alpha:  # Ignore punctuation/numbers
-            num_syllables, primary_stress, secondary_stress = count_syllables(token.text)
-            syllable_counts.append(num_syllables)
-
-            # Stress totals
-            func_data["syllable_stats"]["total_primary_stress"] += primary_stress
-            func_data["syllable_stats"]["total_secondary_stress"] += secondary_stress
-
-            # Categorize words by syllable count
-            att = f"num_{num_syllables}syllable_words"
-            if att not in func_data["syllable_stats"].keys():
-                func_data["syllable_stats"][att] = 1
-            else:
-                func_data["syllable_stats"][att] += 1
-    
-    for att in list(func_data["syllable_stats"].keys()):
-        if att.endswith('syllable_words'):
-            func_data["syllable_stats"][att.replace("num_", "prop_")] = func_data["syllable_stats"][att] / len(tokens)
+
+    counts = (prons or PronunciationCache()).syllable_table.lookup(tokens)
+    syllable_counts = counts[:, 0]
+
+    # Stress totals
+    func_data["syllable_stats"]["total_primary_stress"] = int(counts[:, 1].sum())
+    func_data["syllable_stats"]["total_secondary_stress"] = int(counts[:, 2].sum())
+
+    # Categorize words by syllable count, in order of first appearance
+    values, first_idx = np.unique(syllable_counts, return_index=True)
+    word_counts = np.bincount(syllable_counts)
+    order = values[np.argsort(first_idx)]
+    for num_syllables in order:
+        func_data["syllable_stats"][f"num_{num_syllables}syllable_words"] = int(word_counts[num_syllables])
+    for num_syllables in order:
+        func_data["syllable_stats"][f"prop_{num_syllables}syllable_words"] = int(word_counts[num_syllables]) / len(tokens)
 
     # Compute overall stats
-    func_data["syllable_stats"]["total_syllables"] = sum(syllable_counts)
-    func_data["syllable_stats"]["avg_syllables_per_word"] = sum(syllable_counts) / len(syllable_counts) if syllable_counts else 0
+    total_syllables = int(syllable_counts.sum())
+    func_data["syllable_stats"]["total_syllables"] = total_syllables
+    func_data["syllable_stats"]["avg_syllables_per_word"] = total_syllables / len(tokens)
 
     return func_data
 
@@ -222,38 +260,28 @@ def analyze_phonology(PM, sample_data):
 
     try:
         results = PM.sections["phonology"].init_results_dict()
-
-        NLP = NLPmodel()
-        nlp = NLP.get_nlp()
+        prons = PM.get_pronunciation_cache()
 
         if PM.sentence_level:
             if not isinstance(sample_data, list):
                 raise ValueError("Expected a list of sentence dicts for sentence-level analysis.")
 
-            doc_cleaned = ""
             doc_id = sample_data[0].get("doc_id")
+            sent_docs = PM.get_sent_docs(sample_data, ("cleaned_phon", "cleaned"))
 
-            for sent in sample_data:
+            for sent, doc in zip(sample_data, sent_docs):
                 sent_id = sent.get("sent_id")
-
-                if sent.get("cleaned_phon", ""):
-                    cleaned = sent.get("cleaned_phon", "")
-                else:
-                    cleaned = sent.get("cleaned", "")
-
-                doc = nlp(cleaned)
                 sent_data_base = {"doc_id": doc_id, "sent_id": sent_id}
-                func_data = analyze_syllables(doc)
-                func_data.update(analyze_phonemes(doc))
+                func_data = analyze_syllables(doc, prons)
+                func_data.update(analyze_phonemes(doc, prons))
 
                 for table, row_data in func_data.items():
                     sent_data = sent_data_base.copy()
                     sent_data.update(row_data)
                     results[f"{table}_sent"].append(sent_data)
 
-                doc_cleaned += " " + cleaned
-
-            doc_cleaned = doc_cleaned.strip()
+            # The document-level Doc is assembled from the sentence parses.
+            doc = PM.get_joined_doc(sample_data, ("cleaned_phon", "cleaned"))
 
         else:
             if not isinstance(sample_data, dict):
@@ -261,15 +289,12 @@ def analyze_phonology(PM, sample_data):
             
             doc_id = sample_data.get("doc_id")
             
-            if sample_data.get("cleaned_phon", ""):
-                doc_cleaned = sample_data.get("cleaned_phon", "")
-            else:
-                doc_cleaned = sample_data.get("cleaned", "")
+            field = "cleaned_phon" if sample_data.get("cleaned_phon", "") else "cleaned"
+            doc = PM.get_doc(doc_id, sample_data.get(field, ""), field)
             
         doc_data_base = {"doc_id": doc_id}
-        doc = nlp(doc_cleaned)
-        func_data = analyze_syllables(doc)
-        func_data.update(analyze_phonemes(doc))
+        func_data = analyze_syllables(doc, prons)
+        func_data.update(analyze_phonemes(doc, prons))
 
         for table, row_data in func_data.items():
             doc_data = doc_data_base.copy()
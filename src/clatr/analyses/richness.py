@@ -0,0 +1,192 @@
+import numpy as np
+from math import log, sqrt
+
+# Sample sizes whose mean TTRs vocd fits, as in lexicalrichness
+VOCD_MIN_TOKENS = 35
+
+
+def alpha_token_ids(doc):
+    """
+    Encodes a Doc's alphabetic tokens, lowercased, as dense integer word ids.
+
+    The ids come from spaCy's LOWER hashes, so no text is re-tokenized.
+
+    Returns:
+        tuple: (np.ndarray of word ids in text order, np.ndarray of counts per word id)
+    """
+    from spacy.attrs import LOWER, IS_ALPHA
+    attrs = doc.to_array([LOWER, IS_ALPHA])
+    lower = attrs[attrs[:, 1] == 1, 0]
+    _, ids, counts = np.unique(lower, return_inverse=True, return_counts=True)
+    return ids.reshape(-1).astype(np.int64), counts.astype(np.int64)
+
+def yule_k(counts):
+    """Yule's K from the word counts."""
+    n = int(counts.sum())
+    return 1e4 * (int(np.square(counts).sum()) / n ** 2 - 1 / n)
+
+def yule_i(counts):
+    """Yule's I from the word counts; infinite if every word occurs once."""
+    squares = int(np.square(counts).sum())
+    return len(counts) ** 2 / (squares - len(counts)) if squares != len(counts) else np.inf
+
+def herdan_vm(counts):
+    """Herdan's Vm from the word counts; rounding below zero is clamped, e.g. when every word occurs once."""
+    n = int(counts.sum())
+    values, multiplicity = np.unique(counts, return_counts=True)
+    return sqrt(max(0.0, float((multiplicity * np.square(values / n)).sum()) - 1 / len(counts)))
+
+def simpson_d(counts):
+    """Simpson's D from the word counts."""
+    n = int(counts.sum())
+    return int((counts * (counts - 1)).sum()) / (n * (n - 1))
+
+def dugast(n, terms):
+    """Dugast's U; undefined if every word occurs once."""
+    if n == terms:
+        raise ZeroDivisionError("Word count and term counts are the same.")
+    return log(n) ** 2 / (log(n) - log(terms))
+
+def msttr(ids, window):
+    """
+    Mean segmental TTR over consecutive segments of `window` tokens.
+
+    As in lexicalrichness, the last segment is discarded, even when complete.
+    """
+    n = len(ids)
+    if window < 1 or window >= n:
+        raise ValueError(f"Segment window must be between 1 and {n - 1}.")
+
+    num_segments = -(-n // window) - 1  # all segments but the last
+    segments = np.sort(ids[:num_segments * window].reshape(num_segments, window), axis=1)
+    distinct = 1 + np.count_nonzero(np.diff(segments, axis=1), axis=1)
+    return float(distinct.mean() / window)
+
+def previous_occurrences(ids):
+    """
+    Returns, for each token, the position of the previous token with the same id (or -1).
+    """
+    order = np.argsort(ids, kind="stable")
+    prev = np.full(len(ids), -1, dtype=np.int64)
+    same = ids[order[1:]] == ids[order[:-1]]
+    prev[order[1:][same]] = order[:-1][same]
+    return prev
+
+def mattr(ids, window):
+    """
+    Moving-average TTR over every window of `window` consecutive tokens.
+
+    A token adds a new type to the windows starting after its previous
+    occurrence that still contain it, so the distinct counts of all windows
+    are summed in one vectorized pass instead of one set per window.
+    """
+    n = len(ids)
+    if window < 1 or window > n:
+        raise ValueError(f"Window size must be between 1 and {n}.")
+
+    pos = np.arange(n)
+    first_start = np.maximum(previous_occurrences(ids) + 1, pos - window + 1)
+    last_start = np.minimum(pos, n - window)
+    total_distinct = np.clip(last_start - first_start + 1, 0, None).sum()
+    return float(total_distinct / (window * (n - window + 1)))
+
+def _mtld_pass(ids, num_terms, threshold):
+    seen = [-1] * num_terms  # factor in which each word id was last seen
+    factor = 0
+    word_counter = 0
+    terms = 0
+    factor_count = 0
+    ttr = 1.0
+
+    for word in ids:
+        word_counter += 1
+        if seen[word] != factor:
+            seen[word] = factor
+            terms += 1
+        ttr = terms / word_counter
+        if ttr <= threshold:
+            factor += 1
+            word_counter = terms = 0
+            factor_count += 1
+
+    if word_counter > 0:
+        factor_count += (1 - ttr) / (1 - threshold)
+    if factor_count == 0:
+        overall_ttr = num_terms / len(ids)
+        factor_count += 1 if overall_ttr == 1 else (1 - overall_ttr) / (1 - threshold)
+    return len(ids) / factor_count
+
+def mtld(ids, threshold=0.72):
+    """
+    Measure of textual lexical diversity, averaged over a forward and a reverse pass.
+
+    Each pass is a single O(n) scan; types are tracked by the factor in which
+    they were last seen, so starting a new factor needs no new set.
+    """
+    id_list = ids.tolist()
+    num_terms = int(ids.max()) + 1 if len(ids) else 0
+    forward = _mtld_pass(id_list, num_terms, threshold)
+    reverse = _mtld_pass(id_list[::-1], num_terms, threshold)
+    return (forward + reverse) / 2
+
+def prob_absent(n, counts, draws):
+    """
+    Probability that a word occurring `counts` times among `n` tokens is absent
+    from a random draw of `draws` tokens, i.e. the hypergeometric pmf at 0.
+    """
+    from scipy.special import gammaln
+    counts = np.asarray(counts)
+    rest = n - counts
+    log_p = (gammaln(rest + 1) - gammaln(np.maximum(rest - draws, 0) + 1)
+             - gammaln(n + 1) + gammaln(n - draws + 1))
+    return np.where(rest >= draws, np.exp(log_p), 0.0)
+
+def hdd(counts, draws=42):
+    """
+    HD-D: the expected TTR contribution of each word in a draw of `draws` tokens,
+    computed in closed form once per distinct word count.
+    """
+    n = int(counts.sum())
+    if draws < 1 or draws > n:
+        raise ValueError(f"Number of draws must be between 1 and {n}.")
+
+    values, multiplicity = np.unique(counts, return_counts=True)
+    return float((multiplicity * (1 - prob_absent(n, values, draws))).sum() / draws)
+
+def _ttr_nd(N, D):
+    return (D / N) * (np.sqrt(1 + 2 * (N / D)) - 1)
+
+def vocd(ids, ntokens=50, within_sample=100, iterations=3, seed=42):
+    """
+    Vocd-D: fits D of the TTR(N) curve to mean TTRs of random token samples.
+
+    Each sample is the prefix of a random permutation drawn with a seeded
+    generator, so one draw gives the samples of every size from 35 to
+    `ntokens`, and all samples of an iteration are evaluated as one array.
+    """
+    from scipy.optimize import curve_fit
+
+    n = len(ids)
+    if n <= ntokens:
+        raise ValueError("Number of tokens in text smaller than number of tokens to sample.")
+
+    rng = np.random.default_rng(seed)
+    sizes = np.arange(VOCD_MIN_TOKENS, ntokens + 1)
+    earlier = np.tril(np.ones((ntokens, ntokens), dtype=bool), -1)
+
+    fitted = []
+    for _ in range(iterations):
+        keys = rng.random((within_sample, n))
+        picks = np.argpartition(keys, ntokens - 1, axis=1)[:, :ntokens]
+        picks = np.take_along_axis(picks, np.argsort(np.take_along_axis(keys, picks, axis=1), axis=1), axis=1)
+        sample = ids[picks]
+
+        # A token is a new type if no earlier token of its sample has the same id.
+        repeats = ((sample[:, :, None] == sample[:, None, :]) & earlier).any(axis=2)
+        distinct = np.cumsum(~repeats, axis=1)[:, sizes - 1]
+        mean_ttrs = (distinct / sizes).mean(axis=0)
+
+        popt, _ = curve_fit(_ttr_nd, sizes, mean_ttrs)
+        fitted.append(popt[0])
+
+    return float(np.mean(fitted))
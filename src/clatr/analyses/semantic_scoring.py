@@ -6,8 +6,10 @@ from collections import Counter
 import logging
 logger = logging.getLogger("CustomLogger")
 from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
+from clatr.utils.profiling import profiled
 
 
+@profiled
 def apply_NRCLex(doc):
     """
     Apply NRCLex emotion analysis to a spaCy Doc.
@@ -68,6 +70,7 @@ def apply_NRCLex(doc):
         return {}
 
 
+@profiled
 def apply_VADER(doc):
     """
     Apply VADER sentiment analysis to a spaCy Doc.
@@ -116,6 +119,7 @@ def apply_VADER(doc):
         return {}
 
 
+@profiled
 def apply_TextBlob(doc):
     """
     Apply TextBlob sentiment analysis to a spaCy Doc.
@@ -162,6 +166,7 @@ def apply_TextBlob(doc):
         return {}
 
 
+@profiled
 def apply_Afinn(doc):
     """
     Apply Afinn sentiment analysis to a spaCy Doc.
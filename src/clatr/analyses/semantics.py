@@ -11,9 +11,11 @@ from sklearn.feature_extraction.text import TfidfVectorizer
 # from clatr.data.data_processing import matrix_metrics
 from infoscopy.nlp_utils.data_processing import matrix_metrics
 from clatr.analyses.semantic_scoring import apply_Afinn, apply_VADER, apply_NRCLex, apply_TextBlob
+from clatr.utils.profiling import profiled
 
 warnings.filterwarnings("ignore", message=".*TreeCRF.*does not define `arg_constraints`.*")
 
+@profiled
 def apply_sklearn_TruncSVD(doc, num_topics=5):
     """
     Apply Truncated SVD (Latent Semantic Analysis) to a spaCy Doc.
@@ -103,6 +105,7 @@ def apply_sklearn_TruncSVD(doc, num_topics=5):
         logger.error(f"Error in Sklearn TruncatedSVD: {e}")
         return {}
 
+@profiled
 def compute_token_embeddings(doc):
     """
     Computes token embeddings using spaCy's `en_core_web_lg` model.
@@ -164,6 +167,7 @@ def compute_token_embeddings(doc):
         logger.error(f"Error computing token embeddings: {e}")
         return np.array([])
 
+@profiled
 def compute_sentence_embeddings(doc):
     """
     Computes sentence embeddings using transformer-based embeddings (`en_core_web_trf`).
@@ -286,6 +290,7 @@ def compute_cohesion_decay(sim_matrix, label):
         logger.error(f"Error computing cohesion decay for {label}: {e}")
         return {}
 
+@profiled
 def sentence_level_similarity(doc):
     """
     Computes token-level semantic similarity within a single sentence.
@@ -317,6 +322,7 @@ def sentence_level_similarity(doc):
 
     return results
 
+@profiled
 def document_level_similarity(doc):
     """
     Computes sentence-level semantic similarity within a document.
@@ -361,72 +367,59 @@ def analyze_semantics(PM, sample_data):
     """
     try:
         results = PM.sections["semantics"].init_results_dict()
-        
-        NLP = NLPmodel()
-        nlp = NLP.get_nlp()
 
         if PM.sentence_level:
             if not isinstance(sample_data, list):
                 raise ValueError("Expected a list of sentence dicts for sentence-level analysis.")
             
-            doc_cleaned = ""
-            doc_semantic = ""
             doc_id = sample_data[0].get("doc_id")
+            cleaned_docs = PM.get_sent_docs(sample_data, ("cleaned_phon", "cleaned"))
+            semantic_docs = PM.get_sent_docs(sample_data, ("semantic",))
             
-            for sent in sample_data:
+            for sent, cleaned_doc, semantic_doc in zip(sample_data, cleaned_docs, semantic_docs):
                 func_data = {}
                 sent_id = sent.get("sent_id")
-                if sent.get("cleaned_phon", ""):
-                    cleaned = sent.get("cleaned_phon", "")
-                else:
-                    cleaned = sent.get("cleaned", "")
-                semantic = sent.get("semantic", "")
                 sent_data_base = {"doc_id": doc_id, "sent_id": sent_id}
                 
-                doc = nlp(cleaned)
+                doc = cleaned_doc
                 func_data["unit_sim"] = sentence_level_similarity(doc)
                 func_data["NRCLex"] = apply_NRCLex(doc)
                 func_data["VADER"] = apply_VADER(doc)
                 func_data["TextBlob"] = apply_TextBlob(doc)
                 func_data["Afinn"] = apply_Afinn(doc)
 
-                doc = nlp(semantic)
+                doc = semantic_doc
                 func_data["topics"] = apply_sklearn_TruncSVD(doc, 3)
 
                 for table, row_data in func_data.items():
                     sent_data = sent_data_base.copy()
                     sent_data.update(row_data)
                     results[f"{table}_sent"].append(sent_data)
-                
-                doc_cleaned += " " + sent["cleaned"]
-                doc_semantic += " " + sent["semantic"] + "."
             
-            doc_cleaned = doc_cleaned.strip()
-            doc_semantic = doc_semantic.strip()
+            # Document-level Docs are assembled from the sentence parses.
+            cleaned_doc = PM.get_joined_doc(sample_data, ("cleaned",))
+            semantic_doc = PM.get_joined_doc(sample_data, ("semantic",))
         
         else:
             if not isinstance(sample_data, dict):
                 raise ValueError("Expected a single dict for document-level analysis.")
             
             doc_id = sample_data.get("doc_id")
-            doc_semantic = sample_data.get("semantic", "")
-            
-            if sample_data.get("cleaned_phon", ""):
-                doc_cleaned = sample_data.get("cleaned_phon", "")
-            else:
-                doc_cleaned = sample_data.get("cleaned", "")
+            field = "cleaned_phon" if sample_data.get("cleaned_phon", "") else "cleaned"
+            cleaned_doc = PM.get_doc(doc_id, sample_data.get(field, ""), field)
+            semantic_doc = PM.get_doc(doc_id, sample_data.get("semantic", ""), "semantic")
             
         func_data = {}
         doc_data_base = {"doc_id": doc_id}
             
-        doc = nlp(doc_cleaned)
+        doc = cleaned_doc
         func_data["unit_sim"] = sentence_level_similarity(doc)
         func_data["NRCLex"] = apply_NRCLex(doc)
         func_data["VADER"] = apply_VADER(doc)
         func_data["TextBlob"] = apply_TextBlob(doc)
         func_data["Afinn"] = apply_Afinn(doc)
 
-        doc = nlp(doc_semantic)
+        doc = semantic_doc
         func_data["topics"] = apply_sklearn_TruncSVD(doc, 7)
 
         for table, row_data in func_data.items():
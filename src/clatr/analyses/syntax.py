@@ -9,11 +9,11 @@ from nltk import Tree as nltkTree
 # from clatr.utils.NLPmodel import NLPmodel
 from infoscopy.nlp_utils.NLPmodel import NLPmodel
 from zss import simple_distance, Node
+from spacy.attrs import HEAD, DEP, POS
 from dendropy import Tree, TaxonNamespace
 from dendropy.calculate import treecompare
 from clatr.analyses.morphology import analyze_spacy_features
-# from clatr.data.visualization import make_spacy_dep_pdfs
-from infoscopy.utils.visualization import make_spacy_dep_pdfs
+from clatr.utils.profiling import profiled
 
 def compute_tree_height(token):
     """Recursively compute the height of the syntactic tree."""
@@ -37,18 +37,10 @@ def constituency_to_zss(tree):
         node.addkid(constituency_to_zss(child))
     return node
 
-def sent_to_newick(sent):
-    """Convert a SpaCy Benepar constituency parse into a valid Newick string with sequential numeric node labels."""
-    NLP = NLPmodel()
-    nlp = NLP.get_nlp()
-    new_text = re.sub(r'[^\w\s]','',sent.text)
-    new_doc = nlp(new_text)
-    sent = next(new_doc.sents)
-
-    sent_text = sent._.parse_string  # Get the constituency tree string
-    
+def parse_to_newick(parse_string):
+    """Convert a Benepar constituency parse string into a valid Newick string with sequential numeric node labels."""
     # Remove unwanted punctuation nodes
-    sent_text = re.sub(r'\s\([\.\!\?,;]\s[\.\!\?,;]\)', '', sent_text)
+    sent_text = re.sub(r'\s\([\.\!\?,;]\s[\.\!\?,;]\)', '', parse_string)
 
     # Convert Penn Treebank format to an NLTK Tree object
     tree = nltkTree.fromstring(sent_text)
@@ -78,6 +70,64 @@ def sent_to_newick(sent):
 
     return replace_with_indices(newick)
 
+def sents_to_newick(sents, batch_size=64):
+    """
+    Convert SpaCy sentences into Newick strings of their punctuation-free Benepar parses.
+
+    The punctuation-stripped sentences are re-parsed together with nlp.pipe.
+
+    Args:
+        sents (list): spacy.tokens.Span sentences.
+        batch_size (int): Texts per nlp.pipe batch.
+
+    Returns:
+        list of str: One Newick string per sentence.
+    """
+    NLP = NLPmodel()
+    nlp = NLP.get_nlp()
+    texts = [re.sub(r'[^\w\s]','',sent.text) for sent in sents]
+    return [parse_to_newick(next(new_doc.sents)._.parse_string)
+            for new_doc in nlp.pipe(texts, batch_size=batch_size)]
+
+def sent_to_newick(sent):
+    """Convert a SpaCy Benepar constituency parse into a valid Newick string with sequential numeric node labels."""
+    return sents_to_newick([sent])[0]
+
+def build_constituency_trees(newicks):
+    """
+    Read Newick strings into dendropy trees sharing one TaxonNamespace.
+
+    Sharing the namespace lets any two of the trees be compared, and their
+    bipartitions are encoded up front.
+
+    Args:
+        newicks (list of str): Newick strings.
+
+    Returns:
+        list: dendropy Trees, in the order given.
+    """
+    taxa = TaxonNamespace()
+    trees = []
+    for newick in newicks:
+        tree = Tree.get(data=newick, schema="newick", taxon_namespace=taxa, suppress_internal_node_taxa=True, suppress_leaf_node_taxa=False)
+        tree.encode_bipartitions()
+        trees.append(tree)
+    return trees
+
+def build_sentence_trees(sents, batch_size=64):
+    """
+    Build each sentence's trees once for all pairwise comparisons.
+
+    Args:
+        sents (list): spacy.tokens.Span sentences.
+        batch_size (int): Texts per nlp.pipe batch when re-parsing.
+
+    Returns:
+        tuple: (ZSS dependency trees, constituency Newick strings), one per sentence.
+    """
+    zss_trees = [spacy_to_zss_tree(sent.root) for sent in sents]
+    return zss_trees, sents_to_newick(sents, batch_size)
+
 def run_treecompare(sent1, sent2):
     """
     Compute symmetric difference between two constituency trees in Newick format.
@@ -89,63 +139,157 @@ def run_treecompare(sent1, sent2):
     Returns:
         int: The symmetric difference between two trees.
     """
-    n1 = sent_to_newick(sent1)
-    n2 = sent_to_newick(sent2)
+    t1, t2 = build_constituency_trees(sents_to_newick([sent1, sent2]))
+    return treecompare.symmetric_difference(t1, t2)
 
-    taxa = TaxonNamespace()
+def _row_starts(n):
+    """Index of the first pair (i, i + 1) of each row in the row-major upper triangle."""
+    i = np.arange(n, dtype=np.int64)
+    return i * n - i * (i + 1) // 2
 
-    t1 = Tree.get(data=n1, schema="newick", taxon_namespace=taxa, suppress_internal_node_taxa=True, suppress_leaf_node_taxa=False)
-    t2 = Tree.get(data=n2, schema="newick", taxon_namespace=taxa, suppress_internal_node_taxa=True, suppress_leaf_node_taxa=False)
-    
-    b1 = t1.encode_bipartitions()
-    b2 = t2.encode_bipartitions()
+def select_tree_pairs(n, max_pairs=None, seed=0):
+    """
+    Select the sentence pairs to compare.
 
-    return treecompare.symmetric_difference(t1, t2)
+    All pairs are compared unless there are more than `max_pairs`, in which
+    case a seeded random sample of `max_pairs` pairs is taken.
 
-def compare_trees(doc):
+    Args:
+        n (int): Number of sentences.
+        max_pairs (int): Cap on compared pairs, or None for no cap.
+        seed (int): Seed for the pair sample.
+
+    Returns:
+        tuple: (row indices, column indices, sampling mode), with pairs in
+            row-major upper-triangle order.
+    """
+    total = n * (n - 1) // 2
+    if max_pairs is None or total <= max_pairs:
+        rows, cols = np.triu_indices(n, 1)
+        return rows, cols, "all"
+
+    picks = np.sort(np.random.default_rng(seed).choice(total, size=max_pairs, replace=False))
+    starts = _row_starts(n)
+    rows = np.searchsorted(starts, picks, side="right") - 1
+    cols = picks - starts[rows] + rows + 1
+    return rows, cols, "random"
+
+def _tree_distance_chunk(task):
+    """
+    Compute TED and SD for a chunk of sentence pairs.
+
+    Args:
+        task (tuple): (ZSS trees, Newick strings, row indices, column indices).
+            Trees are given only for the sentences the chunk needs.
+
+    Returns:
+        tuple: (TED array, SD array) for the chunk's pairs.
+    """
+    zss_trees, newicks, rows, cols = task
+    const_trees = dict(zip(newicks, build_constituency_trees(list(newicks.values()))))
+    ted = np.empty(len(rows))
+    sd = np.empty(len(rows))
+    for k, (i, j) in enumerate(zip(rows, cols)):
+        ted[k] = simple_distance(zss_trees[i], zss_trees[j])
+        sd[k] = treecompare.symmetric_difference(const_trees[i], const_trees[j])
+    return ted, sd
+
+def pairwise_tree_distances(zss_trees, newicks, rows, cols, pool=None, num_chunks=1):
+    """
+    Compute dependency TED and constituency SD for the given sentence pairs.
+
+    With a process pool, the pairs are split into contiguous chunks and each
+    chunk is sent with only the trees it needs.
+
+    Args:
+        zss_trees (list): ZSS dependency trees per sentence.
+        newicks (list of str): Constituency Newick strings per sentence.
+        rows (np.ndarray): First sentence of each pair.
+        cols (np.ndarray): Second sentence of each pair.
+        pool (ProcessPoolExecutor): Worker pool, or None to compute serially.
+        num_chunks (int): Number of chunks to split the pairs into.
+
+    Returns:
+        tuple: (TED array, SD array) in pair order.
+    """
+    num_chunks = 1 if pool is None else max(1, min(len(rows), num_chunks))
+    tasks = []
+    for chunk_rows, chunk_cols in zip(np.array_split(rows, num_chunks), np.array_split(cols, num_chunks)):
+        needed = np.union1d(chunk_rows, chunk_cols).tolist()
+        tasks.append(({i: zss_trees[i] for i in needed}, {i: newicks[i] for i in needed},
+                      chunk_rows.tolist(), chunk_cols.tolist()))
+
+    results = map(_tree_distance_chunk, tasks) if pool is None else pool.map(_tree_distance_chunk, tasks)
+    teds, sds = zip(*results)
+    return np.concatenate(teds), np.concatenate(sds)
+
+def full_matrix_nonzero(dists, n):
+    """
+    Non-zero values of the symmetric distance matrix built from upper-triangle distances.
+
+    Gives the values in the row-major order of mat[np.nonzero(mat)] without
+    building the n x n matrix.
+
+    Args:
+        dists (np.ndarray): Distances of all pairs in row-major upper-triangle order.
+        n (int): Number of sentences.
+
+    Returns:
+        np.ndarray: Non-zero matrix values.
+    """
+    starts = _row_starts(n)
+    parts = []
+    for r in range(n):
+        c = np.arange(r)
+        parts.append(dists[starts[c] + r - c - 1])  # (c, r) for c < r
+        parts.append(dists[starts[r]:starts[r] + n - r - 1])  # (r, c) for c > r
+    values = np.concatenate(parts) if parts else np.array([])
+    return values[values != 0]
+
+@profiled
+def compare_trees(doc, batch_size=64, max_pairs=None, seed=0, pool=None, num_chunks=1):
     """
     Compute syntactic similarity matrices using Tree Edit Distance (TED) and Symmetric Distance (SD).
+
+    Each sentence's trees are built once. Beyond `max_pairs` sentence pairs,
+    a seeded random sample of pairs is compared and statistics are taken over
+    its non-zero distances.
     
     Args:
         doc (spacy.tokens.Doc): A processed SpaCy document with sentence boundaries.
+        batch_size (int): Texts per nlp.pipe batch when re-parsing sentences.
+        max_pairs (int): Cap on compared sentence pairs, or None to compare all.
+        seed (int): Seed for the pair sample.
+        pool (ProcessPoolExecutor): Worker pool for the pairwise distances, or None.
+        num_chunks (int): Number of chunks the pairs are split into for the pool.
 
     Returns:
         dict: Computed syntactic diversity metrics.
     """
     sents = list(doc.sents)
     n = len(sents)
+    rows, cols, sampling = select_tree_pairs(n, max_pairs, seed)
     func_data = {}
-    func_data["tree_comp"] = {"total_sents": n}
-
-    # Initialize distance matrices
-    dep_zssdmat = np.zeros((n, n))  # Dependency Tree Edit Distance
-    tree_zssdmat = np.zeros((n, n))  # Constituency Tree Edit Distance
-    tree_sdmat = np.zeros((n, n))  # Constituency Symmetric Distance
-
-    for i in range(n):
-        for j in range(i + 1, n):
-
-            # Compute Dependency Tree Edit Distance (TED)
-            zss1 = spacy_to_zss_tree(sents[i].root)
-            zss2 = spacy_to_zss_tree(sents[j].root)
-            dist_zss_dep = simple_distance(zss1, zss2)
-            dep_zssdmat[i, j] = dist_zss_dep
-            dep_zssdmat[j, i] = dist_zss_dep
-
-            # Compute Constituency Tree Edit Distance (TED)
-            zss1 = spacy_to_zss_tree(sents[i].root)
-            zss2 = spacy_to_zss_tree(sents[j].root)
-            dist_zss_tree = simple_distance(zss1, zss2)
-            tree_zssdmat[i, j] = dist_zss_tree
-            tree_zssdmat[j, i] = dist_zss_tree
-
-            # Compute Constituency Tree Symmetric Difference (SD)
-            dist_sd = run_treecompare(sents[i], sents[j])
-            tree_sdmat[i, j] = dist_sd
-            tree_sdmat[j, i] = dist_sd
-
-    for lab, mat in zip(["dep_zss", "tree_zss", "tree_sdmat"], [dep_zssdmat, tree_zssdmat, tree_sdmat]):
-        nonzero_values = mat[np.nonzero(mat)]  # Extract only non-zero values
+    func_data["tree_comp"] = {
+        "total_sents": n,
+        "total_pairs": n * (n - 1) // 2,
+        "pairs_compared": len(rows),
+        "pair_sampling": sampling,
+    }
+
+    dep_zss = tree_sd = np.array([])
+    if len(rows):
+        zss_trees, newicks = build_sentence_trees(sents, batch_size)
+        # Dependency Tree Edit Distance and Constituency Symmetric Distance
+        dep_zss, tree_sd = pairwise_tree_distances(zss_trees, newicks, rows, cols, pool, num_chunks)
+
+    # "Constituency" TED has always been computed on the same dependency trees,
+    # so it shares the dependency TED values.
+    for lab, dists in zip(["dep_zss", "tree_zss", "tree_sdmat"], [dep_zss, dep_zss, tree_sd]):
+        if sampling == "all":
+            nonzero_values = full_matrix_nonzero(dists, n)  # Extract only non-zero values
+        else:
+            nonzero_values = dists[dists != 0]
         sent_lengths = np.array([len(sent) for sent in sents])  # Sentence lengths
         
         if len(nonzero_values) == 0:  # Avoid division by zero
@@ -172,6 +316,7 @@ def compare_trees(doc):
 
     return func_data
 
+@profiled
 def analyze_syntactic_trees(doc):
     """
     Analyze syntactic tree structure from a text using SpaCy.
@@ -203,75 +348,84 @@ def analyze_syntactic_trees(doc):
         "depth_per_token_avg": 0
     }
 
-    tree_heights = []
-    subject_distances = []
-    depth_per_token = []
-    dep_counts = Counter()
-    branch_counts = Counter()
-    total_children = 0
-    total_nodes = 0
-    conjunction_data = Counter()
-    negation_data = Counter()
-    total_negations = 0
-    not_count = 0
-    contracted_neg_count = 0
+    n = len(doc)
+    arr = doc.to_array([HEAD, DEP, POS])
+    offsets = arr[:, 0].view(np.int64)  # HEAD is stored as a signed offset from the token
+    idx = np.arange(n, dtype=np.int64)
+    heads = idx + offsets
+    is_child = heads != idx
+    strings = doc.vocab.strings
+
+    def label_mask(ids, match):
+        """Marks tokens whose DEP or POS label satisfies `match`."""
+        labels = np.unique(ids)
+        return np.isin(ids, [label for label in labels if match(strings[int(label)])])
+
+    deps, pos = arr[:, 1], arr[:, 2]
+
+    # Depth of every token (number of ancestors) by pointer jumping over the head array
+    depth = is_child.astype(np.int64)
+    top = heads.copy()
+    for _ in range(max(1, int(np.ceil(np.log2(n + 1))))):
+        depth = depth + depth[top]
+        top = top[top]
+    depth_per_token = depth
+
+    # Tree height per root: 1 + the greatest depth below it
+    subtree_heights = np.zeros(n, dtype=np.int64)
+    np.maximum.at(subtree_heights, top, depth)
 
+    tree_heights = []
     for sent in doc.sents:
         root = sent.root
         func_data["syn_trees"]["num_root_tokens"] += 1
 
         # Compute tree height for this sentence
-        tree_height = compute_tree_height(root)
-        tree_heights.append(tree_height)
-
-        # Compute depth per token
-        for token in sent:
-            depth = len(list(token.ancestors))
-            depth_per_token.append(depth)
-
-            # Track dependency relations
-            dep_counts[token.dep_] += 1
-
-            # Measure subject-to-root distance
-            if "subj" in token.dep_:  
-                subject_distances.append(depth)
-
-            # Analyze branching
-            num_children = len(list(token.children))
-            if num_children > 0:
-                branch_counts[f"n{num_children}_branchings"] += 1
-                total_children += num_children
-                total_nodes += 1
-
-            # Track Coordinating Conjunctions (CC)
-            if token.dep_ == "cc":  
-                conjunction = token.text.upper()
-                conjunction_data[f"{conjunction}_count"] += 1
-
-                # Find the coordinated elements
-                left_phrase = next(token.head.lefts, None)
-                right_phrase = next(token.head.rights, None)
-
-                if left_phrase and right_phrase:
-                    left_type = left_phrase.pos_
-                    right_type = right_phrase.pos_
-                    phrase_pair = f"{left_type}_{right_type}"
-                    conjunction_data[f"{conjunction}_{phrase_pair}"] += 1
-
-            # Track Negations ("not", "n't")
-            if token.dep_ == "neg":
-                total_negations += 1
-                if "'" in token.text:
-                    contracted_neg_count += 1
-                else:
-                    not_count += 1
-                negation_data[f"neg_{token.head.pos_}_count"] += 1
-
-        # Count phrase types
-        func_data["syn_trees"]["num_NP"] += sum(1 for chunk in doc.noun_chunks if chunk.root in sent)
-        func_data["syn_trees"]["num_VP"] += sum(1 for token in sent if token.pos_ == "VERB" and token.dep_ == "ROOT")
-        func_data["syn_trees"]["num_PP"] += sum(1 for token in sent if token.pos_ == "ADP")  
-        func_data["syn_trees"]["num_clauses"] += sum(1 for token in sent if token.dep_ in {"ccomp", "advcl", "acl", "relcl"})
+        if depth[root.i] == 0:
+            tree_heights.append(int(subtree_heights[root.i]) + 1)
+        else:
+            tree_heights.append(compute_tree_height(root))
+
+    # Measure subject-to-root distance
+    subject_distances = depth[label_mask(deps, lambda label: "subj" in label)]
+
+    # Analyze branching, with branching types in order of first appearance
+    num_children = np.bincount(heads[is_child], minlength=n)
+    branching = num_children[num_children > 0]
+    branch_counts = {}
+    if len(branching):
+        kinds, first_idx = np.unique(branching, return_index=True)
+        kind_counts = np.bincount(branching)
+        for kind in kinds[np.argsort(first_idx)]:
+            branch_counts[f"n{kind}_branchings"] = int(kind_counts[kind])
+    total_children = int(branching.sum())
+    total_nodes = len(branching)
+
+    # Track Coordinating Conjunctions (CC) and Negations ("not", "n't")
+    conjunction_data = Counter()
+    negation_data = Counter()
+    for i in np.flatnonzero(label_mask(deps, lambda label: label in ("cc", "neg"))):
+        token = doc[int(i)]
+        if token.dep_ == "cc":
+            conjunction = token.text.upper()
+            conjunction_data[f"{conjunction}_count"] += 1
+
+            # Find the coordinated elements
+            left_phrase = next(token.head.lefts, None)
+            right_phrase = next(token.head.rights, None)
+
+            if left_phrase and right_phrase:
+                phrase_pair = f"{left_phrase.pos_}_{right_phrase.pos_}"
+                conjunction_data[f"{conjunction}_{phrase_pair}"] += 1
+        else:
+            negation_data[f"neg_{token.head.pos_}_count"] += 1
+
+    # Count phrase types
+    func_data["syn_trees"]["num_NP"] = sum(1 for _ in doc.noun_chunks)
+    func_data["syn_trees"]["num_VP"] = int(np.sum(label_mask(pos, lambda label: label == "VERB")
+                                                  & label_mask(deps, lambda label: label == "ROOT")))
+    func_data["syn_trees"]["num_PP"] = int(np.sum(label_mask(pos, lambda label: label == "ADP")))
+    func_data["syn_trees"]["num_clauses"] = int(np.sum(label_mask(deps, lambda label: label in {"ccomp", "advcl", "acl", "relcl"})))
 
     # Final calculations
     if tree_heights:
@@ -279,12 +433,12 @@ def analyze_syntactic_trees(doc):
         func_data["syn_trees"]["min_tree_height"] = min(tree_heights)
         func_data["syn_trees"]["avg_tree_height"] = np.mean(tree_heights)
 
-    func_data["syn_trees"]["mean_dependency_distance"] = np.mean([abs(token.i - token.head.i) for token in doc if token.head != token])
+    func_data["syn_trees"]["mean_dependency_distance"] = np.mean(np.abs(offsets[is_child]))
     
-    if subject_distances:
+    if len(subject_distances):
         func_data["syn_trees"]["subj_to_root_distance_avg"] = np.mean(subject_distances)
 
-    if depth_per_token:
+    if len(depth_per_token):
         func_data["syn_trees"]["depth_per_token_avg"] = np.mean(depth_per_token)
 
     func_data["syn_trees"]["avg_branching_factor"] = total_children / total_nodes if total_nodes > 0 else 0
@@ -302,21 +456,16 @@ def analyze_syntax(PM, sample_data):
     try:
         results = PM.sections["syntax"].init_results_dict()
 
-        NLP = NLPmodel()
-        nlp = NLP.get_nlp()
-
         if PM.sentence_level:
             if not isinstance(sample_data, list):
                 raise ValueError("Expected a list of sentence dicts for sentence-level analysis.")
             
-            doc_cleaned = ""
             doc_id = sample_data[0].get("doc_id")            
+            sent_docs = PM.get_sent_docs(sample_data, ("cleaned",))
             
-            for sent in sample_data:
+            for sent, doc in zip(sample_data, sent_docs):
                 sent_id = sent.get("sent_id")
-                cleaned = sent.get("cleaned", "")
 
-                doc = nlp(cleaned)
                 sent_data_base = {"doc_id": doc_id, "sent_id": sent_id}
                 func_data = analyze_syntactic_trees(doc)
                 func_data.update(analyze_spacy_features(doc, 5, "DEP"))
@@ -326,22 +475,21 @@ def analyze_syntax(PM, sample_data):
                     sent_data.update(row_data)
                     results[f"{table}_sent"].append(sent_data)
 
-                doc_cleaned += " " + cleaned
-
-            doc_cleaned = doc_cleaned.strip()
+            # The document-level Doc is assembled from the sentence parses.
+            doc = PM.get_joined_doc(sample_data, ("cleaned",))
 
         else:
             if not isinstance(sample_data, dict):
                 raise ValueError("Expected a single dict for document-level analysis.")
             
-            doc_cleaned = sample_data.get("cleaned", "")
             doc_id = sample_data.get("doc_id")
+            doc = PM.get_doc(doc_id, sample_data.get("cleaned", ""), "cleaned")
 
         doc_data_base = {"doc_id": doc_id}
-        doc = nlp(doc_cleaned)
         func_data = analyze_syntactic_trees(doc)
         func_data.update(analyze_spacy_features(doc, 10, "DEP"))
-        func_data.update(compare_trees(doc))
+        func_data.update(compare_trees(doc, PM.parse_batch_size, PM.max_tree_pairs, PM.tree_pair_seed,
+                                        PM.get_tree_pool(), 4 * PM.tree_workers))
 
         for table, row_data in func_data.items():
             doc_data = doc_data_base.copy()
@@ -349,6 +497,9 @@ def analyze_syntax(PM, sample_data):
             results[f"{table}_doc"].update(doc_data)
 
         if PM.dep_trees:
+            # Imported here so plotting libraries only load when trees are drawn.
+            # from clatr.data.visualization import make_spacy_dep_pdfs
+            from infoscopy.utils.visualization import make_spacy_dep_pdfs
             path = os.path.join(PM.om.output_dir, "syntax", "doc", "dep_trees")
             logger.info(f"Saving dep trees to {path}")
             make_spacy_dep_pdfs(doc, doc_id, path)
@@ -1,4 +1,31 @@
 #!/usr/bin/env python3
-def main():
+import argparse
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="clatr",
+        description="Comprehensive Linguistic Analysis of Text for Research"
+    )
+    parser.add_argument("--resume", action="store_true",
+                        help="Resume an interrupted run from its checkpoints.")
+    subparsers = parser.add_subparsers(dest="command")
+
+    cache = subparsers.add_parser("cache", help="Inspect or prune the result cache.")
+    cache.add_argument("cache_command", choices=["stats", "prune"])
+    cache.add_argument("--config", default="config.yaml", help="Config file to read cache settings from.")
+    cache.add_argument("--cache-dir", default=None, help="Cache directory (overrides the config).")
+    cache.add_argument("--max-mb", type=float, default=None, help="Size limit in MB for pruning.")
+
+    return parser
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+
+    if args.command == "cache":
+        from .utils.ResultCache import run_cache_command
+        run_cache_command(args)
+        return
+
     from .main import main as main_core
-    main_core()
+    main_core(resume=args.resume)
@@ -0,0 +1,106 @@
+import os
+import re
+import json
+import numpy as np
+from array import array
+import logging
+logger = logging.getLogger("CustomLogger")
+from clatr.analyses.ngrams import OTHER_NGRAM
+
+NGRAM_TABLE = re.compile(r"_n\d+grams_(doc|sent)$")
+ROW_KEYS = {"doc": ("doc_id",), "sent": ("doc_id", "sent_id")}
+
+
+def is_ngram_table(table_name):
+    """
+    Checks whether a raw table holds per-n-gram rows (e.g. "lex_n2grams_doc").
+    """
+    return NGRAM_TABLE.search(table_name) is not None
+
+def _json_value(value):
+    return value.item() if hasattr(value, "item") else str(value)
+
+
+class NgramMatrix:
+    """
+    Sparse document-by-n-gram matrix built from the rows of one n-gram table.
+
+    Rows are documents (or sentences) and columns n-grams, both numbered in
+    order of first appearance. Entries are accumulated as coordinate arrays,
+    so memory grows with the number of non-zeros rather than rows x columns.
+    "__other__" rows (`ngram_other_bucket`) are not n-grams and are left out.
+    """
+    def __init__(self, table_name, value="proportion"):
+        self.table_name = table_name
+        self.value = value
+        self.row_keys = ROW_KEYS[NGRAM_TABLE.search(table_name).group(1)]
+        self.index = {}  # row key tuple: row number
+        self.vocab = {}  # ngram: column number
+        self.row_ids = array("q")
+        self.col_ids = array("q")
+        self.values = array("d")
+
+    def add(self, rows):
+        """
+        Adds the n-gram rows of one document.
+
+        Args:
+            rows (list of dict): Rows with the row keys, "ngram" and the value column.
+        """
+        for row in rows:
+            if row["ngram"] == OTHER_NGRAM:
+                continue
+            key = tuple(row[k] for k in self.row_keys)
+            self.row_ids.append(self.index.setdefault(key, len(self.index)))
+            self.col_ids.append(self.vocab.setdefault(row["ngram"], len(self.vocab)))
+            self.values.append(row[self.value])
+
+    def to_csr(self):
+        """
+        Returns the matrix as a scipy.sparse CSR matrix.
+        """
+        from scipy import sparse
+        return sparse.csr_matrix(
+            (np.frombuffer(self.values, dtype=np.float64),
+             (np.frombuffer(self.row_ids, dtype=np.int64), np.frombuffer(self.col_ids, dtype=np.int64))),
+            shape=(len(self.index), len(self.vocab))
+        )
+
+    def save(self, out_dir):
+        """
+        Writes `<table>.npz` with the CSR matrix, `<table>_ngrams.json` with the
+        column labels and `<table>_rows.json` with the row keys.
+
+        Returns:
+            str: Path of the .npz file.
+        """
+        from scipy import sparse
+        os.makedirs(out_dir, exist_ok=True)
+        base = os.path.join(out_dir, self.table_name)
+
+        sparse.save_npz(f"{base}.npz", self.to_csr())
+        with open(f"{base}_ngrams.json", "w") as f:
+            json.dump(list(self.vocab), f)
+        with open(f"{base}_rows.json", "w") as f:
+            rows = [dict(zip(self.row_keys, key)) for key in self.index]
+            json.dump({"value": self.value, "rows": rows}, f, default=_json_value)
+
+        logger.info(f"Saved {len(self.index)} x {len(self.vocab)} n-gram matrix "
+                    f"({len(self.values)} non-zeros) to {base}.npz")
+        return f"{base}.npz"
+
+def load_ngram_matrix(out_dir, table_name):
+    """
+    Loads a matrix written by `NgramMatrix.save`.
+
+    Returns:
+        tuple: (scipy.sparse.csr_matrix, list of n-grams, list of row key dicts)
+    """
+    from scipy import sparse
+    base = os.path.join(out_dir, table_name)
+    matrix = sparse.load_npz(f"{base}.npz")
+    with open(f"{base}_ngrams.json") as f:
+        ngrams = json.load(f)
+    with open(f"{base}_rows.json") as f:
+        rows = json.load(f)["rows"]
+    return matrix, ngrams, rows
@@ -1,53 +1,409 @@
 from tqdm import tqdm
+from collections import deque
+from multiprocessing.util import Finalize
+from concurrent.futures import ProcessPoolExecutor
 # from clatr.utils.logger import logger
 from infoscopy.utils.logger import logger
 # from clatr.utils.OutputManager import OutputManager
 from infoscopy.utils.OutputManager import OutputManager
 from  .utils.PipelineManager import PipelineManager
+from .utils.CheckpointManager import CheckpointManager
+from .utils.profiling import summarize_timings
+from .data.ngram_matrix import NgramMatrix, is_ngram_table
 
+_worker_PM = None
 
-def main():
+
+def _init_worker():
+    """
+    Loads the pipeline and spaCy model once per worker process.
+
+    Workers compare sentence trees serially; a tree pool inside each worker
+    would nest process pools and oversubscribe the CPUs.
+    """
+    # from clatr.utils.NLPmodel import NLPmodel
+    from infoscopy.nlp_utils.NLPmodel import NLPmodel
+    global _worker_PM
+    _worker_PM = PipelineManager(OutputManager())
+    _worker_PM.tree_workers = 1
+    NLPmodel().get_nlp()
+    # Stop the worker's LanguageTool servers when the process exits.
+    Finalize(_worker_PM, _worker_PM.close, exitpriority=10)
+
+def run_doc_sections(PM, sections, doc_id, sample_data, release=True):
+    """
+    Runs the given sections on one document.
+
+    Args:
+        PM (PipelineManager): The pipeline manager.
+        sections (list): Section names to run, in order.
+        doc_id: Document identifier.
+        sample_data (dict or list of dict): The document's sample data.
+        release (bool): Whether to drop the document's parsed Docs afterwards.
+
+    Returns:
+        dict: {section: results dict}
+    """
+    doc_results = {}
+    for section in sections:
+        logger.info(f"Running {section} analysis for doc_id {doc_id}")
+        doc_results[section] = PM.run_section(section, sample_data)
+
+    if release:
+        PM.release_docs(doc_id)
+
+    return doc_results
+
+def _run_worker_doc(task):
+    """
+    Runs the given sections on one document inside a worker process.
+
+    Returns:
+        tuple: (doc_id, {section: results dict}, timing rows, n-gram sketch or None)
+    """
+    sections, doc_id, sample_data = task
+    doc_results = run_doc_sections(_worker_PM, sections, doc_id, sample_data)
+    return doc_id, doc_results, _worker_PM.pop_timings(), _worker_PM.pop_ngram_sketch()
+
+def iter_doc_results(PM, sections, doc_ids, pool=None, release=True, checkpoints=None):
+    """
+    Runs sections over all documents, yielding results in doc_id order.
+
+    Each document's sample data is fetched once and every given section is run
+    on it before the next document starts. With checkpoints, completed
+    (section, doc_id) pairs are skipped and their saved results reloaded;
+    pairs whose checkpoint is unusable are run again.
+
+    Args:
+        PM (PipelineManager): The pipeline manager.
+        sections (list): Section names to run on each document.
+        doc_ids (list): Document identifiers in output order.
+        pool (ProcessPoolExecutor): Worker pool, or None to run serially.
+        release (bool): Whether to drop parsed Docs once a document is done
+            (serial runs only; workers always release them).
+        checkpoints (CheckpointManager): Checkpoint store, or None.
+
+    Yields:
+        tuple: (doc_id, {section: results dict}) for each non-empty document.
+    """
+    def pending_sections(doc_id):
+        """Returns the sections to run and {section: results} reloaded from checkpoints."""
+        if checkpoints is None:
+            return list(sections), {}
+
+        todo, reloaded = [], {}
+        for section in sections:
+            results = None
+            if checkpoints.has(section, doc_id):
+                results = checkpoints.load(section, doc_id, PM.get_cache_settings(section))
+            if results is None:
+                todo.append(section)
+            else:
+                reloaded[section] = results
+        return todo, reloaded
+
+    def finish(doc_id, doc_results, reloaded):
+        """Checkpoints fresh results and merges in previously saved ones."""
+        merged = {}
+        for section in sections:
+            if section in doc_results:
+                merged[section] = doc_results[section]
+                # Failed analyses return {} and are left to be retried on resume.
+                if checkpoints is not None and doc_results[section]:
+                    checkpoints.save(section, doc_id, doc_results[section], PM.get_cache_settings(section))
+            elif section in reloaded:
+                merged[section] = reloaded[section]
+                PM.add_reloaded_ngrams(merged[section])
+        return merged
+
+    if pool is None:
+        for doc_id in tqdm(doc_ids, desc="Analyzing samples"):
+            todo, reloaded = pending_sections(doc_id)
+            doc_results = {}
+
+            if todo:
+                sample_data = PM.get_sample_data(doc_id)
+
+                if not sample_data:
+                    logger.warning(f"Skipping empty doc {doc_id}")
+                    continue
+
+                doc_results = run_doc_sections(PM, todo, doc_id, sample_data, release)
+            else:
+                logger.info(f"Resuming from checkpoints for doc_id {doc_id}")
+
+            yield doc_id, finish(doc_id, doc_results, reloaded)
+        return
+
+    # At most 2 x workers documents are in flight, and they are yielded in
+    # submission order, so memory does not grow with the corpus and outputs
+    # stay deterministic. Checkpoints are only loaded when a document's turn
+    # comes; sections whose checkpoint turns out unusable then run here.
+    window = deque()  # (doc_id, future or None, checkpointed sections)
+    max_in_flight = 2 * max(1, PM.workers)
+    progress = tqdm(total=len(doc_ids), desc="Analyzing samples")
+
+    def next_result():
+        doc_id, future, done = window.popleft()
+        doc_results = {}
+        if future is not None:
+            _, doc_results, timings, sketch = future.result()
+            PM.timings.extend(timings)
+            if sketch is not None:
+                PM.ngram_sketch.merge(sketch)
+
+        reloaded, rerun = {}, []
+        for section in done:
+            results = checkpoints.load(section, doc_id, PM.get_cache_settings(section))
+            if results is None:
+                rerun.append(section)
+            else:
+                reloaded[section] = results
+        if rerun:
+            sample_data = PM.get_sample_data(doc_id)
+            if sample_data:
+                doc_results.update(run_doc_sections(PM, rerun, doc_id, sample_data))
+
+        progress.update()
+        return doc_id, finish(doc_id, doc_results, reloaded)
+
+    for doc_id in doc_ids:
+        if len(window) >= max_in_flight:
+            yield next_result()
+
+        done = [] if checkpoints is None else [s for s in sections if checkpoints.has(s, doc_id)]
+        todo = [s for s in sections if s not in done]
+        future = None
+        if todo:
+            sample_data = PM.get_sample_data(doc_id)
+
+            if not sample_data:
+                logger.warning(f"Skipping empty doc {doc_id}")
+                progress.update()
+                continue
+
+            future = pool.submit(_run_worker_doc, (todo, doc_id, sample_data))
+
+        window.append((doc_id, future, done))
+
+    while window:
+        yield next_result()
+    progress.close()
+
+def store_results(OM, results, section_results, backend=None, matrices=None):
+    """
+    Sends one document's section results to the output tables or backend.
+
+    Args:
+        OM (OutputManager): The output manager.
+        results (dict): {table_name: data} returned by the analysis.
+        section_results (dict): {table_name: latest data}, updated in place.
+        backend (ParquetBackend): Streaming backend, or None to keep rows in OM.tables.
+        matrices (dict): {table_name: NgramMatrix} fed with n-gram rows, or None.
+    """
+    for table_name, data in results.items():
+        if backend is not None:
+            backend.write(table_name, data)
+        else:
+            OM.tables[table_name].update_data(data)
+        section_results[table_name] = data
+
+        if matrices is not None and is_ngram_table(table_name) and data:
+            if table_name not in matrices:
+                matrices[table_name] = NgramMatrix(table_name)
+            matrices[table_name].add(data)
+
+def finalize_section(OM, PM, section, section_results, backend=None, matrices=None):
+    """
+    Exports a section's raw tables and runs its optional downstream analyses.
+
+    Args:
+        OM (OutputManager): The output manager.
+        PM (PipelineManager): The pipeline manager.
+        section (str): Section name.
+        section_results (dict): {table_name: latest data} for the section.
+        backend (ParquetBackend): Streaming backend, or None.
+        matrices (dict): {table_name: NgramMatrix} to save next to their tables, or None.
+    """
+    for table_name, matrix in (matrices or {}).items():
+        matrix.save(OM.tables[table_name].file_path)
+
+    if backend is not None:
+        backend.flush()
+        # Excel and the downstream analyses work on OM.tables, so load back only if needed.
+        if PM.export_excel or OM.cluster or OM.aggregate or OM.compare_groups or OM.visualize:
+            backend.load_into_tables(section_results)
+
+    if PM.export_excel:
+        for table_name in section_results:
+            OM.tables[table_name].export_to_excel()
+
+    if OM.cluster:
+        for table_name in section_results:
+            OM.run_clustering(table_name, section)
+
+    if OM.aggregate or OM.compare_groups:
+        OM.run_aggregate_analyses(section_results, section)
+
+    if OM.visualize:
+        OM.generate_visuals(section)
+
+def run_section_major(OM, PM, doc_ids, pool=None, checkpoints=None, backend=None):
+    """
+    Runs each section over all documents before moving to the next section.
+
+    Serially, parsed Docs are kept for later sections up to the pipeline's
+    `max_parsed_docs` limit and released after the last section. Worker
+    processes release each document's Docs as soon as it is done, so with
+    `workers` > 1 Docs are never shared across sections in this mode.
+    """
+    sections = list(PM.analyses)
+    for section in sections:
+        logger.info(f"Running {section} analysis.")
+        PM.sections[section].create_raw_data_tables()
+        if backend is not None:
+            backend.start_tables(PM.sections[section].init_results_dict())
+        section_results = {}  # table_name: latest data, as returned by the analyses
+        matrices = {} if PM.ngram_matrix else None
+
+        # Parsed Docs are kept so later sections can reuse them, until the last section.
+        release = section == sections[-1]
+        for doc_id, doc_results in iter_doc_results(PM, [section], doc_ids, pool, release, checkpoints):
+            store_results(OM, doc_results.get(section, {}), section_results, backend, matrices)
+
+        finalize_section(OM, PM, section, section_results, backend, matrices)
+
+def run_document_major(OM, PM, doc_ids, pool=None, checkpoints=None, backend=None):
+    """
+    Runs every section on each document before moving to the next document.
+    """
+    sections = list(PM.analyses)
+    logger.info(f"Running {', '.join(sections)} analyses document by document.")
+
+    all_results = {}  # section: {table_name: latest data}
+    all_matrices = {}  # section: {table_name: NgramMatrix}, or None
+    for section in sections:
+        PM.sections[section].create_raw_data_tables()
+        if backend is not None:
+            backend.start_tables(PM.sections[section].init_results_dict())
+        all_results[section] = {}
+        all_matrices[section] = {} if PM.ngram_matrix else None
+
+    for doc_id, doc_results in iter_doc_results(PM, sections, doc_ids, pool, checkpoints=checkpoints):
+        for section, results in doc_results.items():
+            store_results(OM, results, all_results[section], backend, all_matrices[section])
+
+    for section in sections:
+        finalize_section(OM, PM, section, all_results[section], backend, all_matrices[section])
+
+def write_timing_report(OM, PM):
+    """
+    Exports per-document timings and a per-section summary, and logs the summary.
+    """
+    timings = PM.pop_timings()
+    if not timings:
+        return
+
+    summary = summarize_timings(timings)
+    for name, rows, primary_keys in [("timings", timings, ["doc_id", "section"]),
+                                     ("timings_summary", summary, ["section"])]:
+        OM.create_table(
+            name=name,
+            sheet_name=name,
+            section="timings",
+            subdir="timings",
+            file_name="timings.xlsx",
+            primary_keys=primary_keys,
+            pivot=None
+        )
+        OM.tables[name].update_data(rows)
+        OM.tables[name].export_to_excel()
+
+    for row in summary:
+        docs_per_sec = f"{row['docs_per_sec']:.2f}" if row["docs_per_sec"] else "n/a"
+        tokens_per_sec = f"{row['tokens_per_sec']:.0f}" if row["tokens_per_sec"] else "n/a"
+        logger.info(
+            f"{row['section']}: {row['num_docs']} docs, {docs_per_sec} docs/s, "
+            f"{tokens_per_sec} tokens/s, p50 {row['p50_wall_s']:.3f}s, p95 {row['p95_wall_s']:.3f}s"
+        )
+
+def write_corpus_ngrams(OM, PM):
+    """
+    Exports the corpus-wide top n-grams of each n-gram table from the sketch.
+    """
+    rows = PM.ngram_sketch.to_rows(PM.corpus_ngram_top_k)
+    if not rows:
+        return
+
+    OM.create_table(
+        name="corpus_ngrams",
+        sheet_name="corpus_ngrams",
+        section="corpus_ngrams",
+        subdir="corpus_ngrams",
+        file_name="corpus_ngrams.xlsx",
+        primary_keys=["table", "rank"],
+        pivot=None
+    )
+    OM.tables["corpus_ngrams"].update_data(rows)
+    OM.tables["corpus_ngrams"].export_to_excel()
+
+    if PM.ngram_sketch.capacity is not None:
+        for table, floor in sorted(PM.ngram_sketch.floors.items()):
+            logger.info(f"{table}: corpus counts overestimate by at most {floor}.")
+
+def main(*, resume=False):
     """
     Main pipeline for processing and analyzing text samples.
+
+    Args:
+        resume (bool): Skip (section, doc_id) pairs completed by an earlier,
+            interrupted run and reload their checkpointed results.
     """
+    pool = None
+    PM = None
     try:
         OM = OutputManager()
         PM = PipelineManager(OM)
 
         doc_ids = PM.run_preprocessing()
 
-        for section in PM.analyses:
-            logger.info(f"Running {section} analysis.")
-            PM.sections[section].create_raw_data_tables()
-                    
-            for doc_id in tqdm(doc_ids, desc="Analyzing samples"):
-                sample_data = PM.get_sample_data(doc_id)
-                
-                if not sample_data:
-                    logger.warning(f"Skipping empty doc {doc_id}")
-                    continue
+        checkpoints = None
+        if PM.checkpoint:
+            checkpoints = CheckpointManager(OM.output_dir, resume)
+            if resume:
+                logger.info(f"Resuming from checkpoints in {checkpoints.checkpoint_dir}")
+
+        if PM.workers > 1:
+            logger.info(f"Distributing documents over {PM.workers} worker processes.")
+            pool = ProcessPoolExecutor(max_workers=PM.workers, initializer=_init_worker)
 
-                logger.info(f"Running {section} analysis for doc_id {doc_id}")
-                results = PM.run_section(section, sample_data)
-                
-                for table_name, data in results.items():
-                    OM.tables[table_name].update_data(data)
-            
-            for table_name in results:
-                OM.tables[table_name].export_to_excel()            
-            
-            if OM.cluster:
-                for table_name in results:
-                    OM.run_clustering(table_name, section)
-            
-            if OM.aggregate or OM.compare_groups:
-                OM.run_aggregate_analyses(results, section)
-            
-            if OM.visualize:
-                OM.generate_visuals(section)
+        backend = None
+        if PM.output_format == "parquet":
+            from .utils.ParquetBackend import ParquetBackend
+            backend = ParquetBackend(OM, PM.parquet_batch_rows)
+
+        if PM.schedule == "document":
+            run_document_major(OM, PM, doc_ids, pool, checkpoints, backend)
+        else:
+            run_section_major(OM, PM, doc_ids, pool, checkpoints, backend)
+
+        if PM.ngram_sketch is not None:
+            write_corpus_ngrams(OM, PM)
+
+        if PM.record_timings:
+            write_timing_report(OM, PM)
+
+        if checkpoints is not None:
+            checkpoints.clear()
 
     except Exception as e:
         logger.error(f"Pipeline failed: {e}")
 
+    finally:
+        if pool is not None:
+            pool.shutdown()
+        if PM is not None:
+            PM.close()
+
 if __name__ == "__main__":
     main()
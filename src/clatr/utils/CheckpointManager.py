@@ -0,0 +1,100 @@
+import os
+import re
+import json
+import pickle
+import hashlib
+import shutil
+import logging
+logger = logging.getLogger("CustomLogger")
+
+
+class CheckpointManager:
+    """
+    Per-section, per-document checkpoints that let an interrupted run resume.
+
+    Each completed (section, doc_id) pair is saved as the pickled results dict
+    returned by its analysis, under `<output_dir>/checkpoints/<section>/`,
+    together with a digest of the settings it was computed with. A fresh run
+    clears old checkpoints; a resumed run skips the saved pairs and reloads
+    their results instead, unless they are unreadable or their settings differ.
+    """
+    def __init__(self, output_dir, resume=False):
+        self.checkpoint_dir = os.path.join(output_dir, "checkpoints")
+        self.resume = resume
+
+        if not resume:
+            self.clear()
+        os.makedirs(self.checkpoint_dir, exist_ok=True)
+
+    def _path(self, section, doc_id):
+        safe_id = re.sub(r"[^\w.-]", "_", str(doc_id))
+        return os.path.join(self.checkpoint_dir, section, f"{safe_id}.pkl")
+
+    def has(self, section, doc_id):
+        """
+        Checks whether a (section, doc_id) pair has been completed.
+        """
+        return os.path.exists(self._path(section, doc_id))
+
+    @staticmethod
+    def settings_digest(settings):
+        """
+        Hashes the settings (config values, code and model versions) results depend on.
+        """
+        payload = json.dumps(settings, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def load(self, section, doc_id, settings=None):
+        """
+        Loads the saved results of a completed (section, doc_id) pair.
+
+        A checkpoint that cannot be read, belongs to another document or was
+        saved with different settings is deleted, so the pair is run again.
+
+        Args:
+            section (str): Section name.
+            doc_id: Document identifier.
+            settings (dict): Settings the results must have been computed with.
+
+        Returns:
+            dict: The results dict, or None if the checkpoint is unusable.
+        """
+        path = self._path(section, doc_id)
+        try:
+            with open(path, "rb") as f:
+                saved_id, saved_settings, results = pickle.load(f)
+            if str(saved_id) != str(doc_id):
+                raise ValueError(f"checkpoint belongs to doc_id {saved_id}")
+            if saved_settings != self.settings_digest(settings):
+                raise ValueError("checkpoint was saved with different settings")
+            return results
+        except Exception as e:
+            logger.warning(f"Discarding checkpoint {path}: {e}")
+            if os.path.exists(path):
+                os.remove(path)
+            return None
+
+    def save(self, section, doc_id, results, settings=None):
+        """
+        Saves the results of a (section, doc_id) pair atomically.
+
+        Args:
+            section (str): Section name.
+            doc_id: Document identifier.
+            results (dict): The section's results for the document.
+            settings (dict): Settings the results were computed with.
+        """
+        path = self._path(section, doc_id)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump((doc_id, self.settings_digest(settings), results), f,
+                        protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+
+    def clear(self):
+        """
+        Removes all checkpoints.
+        """
+        if os.path.isdir(self.checkpoint_dir):
+            shutil.rmtree(self.checkpoint_dir)
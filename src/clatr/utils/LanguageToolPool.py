@@ -0,0 +1,95 @@
+import queue
+import threading
+import logging
+logger = logging.getLogger("CustomLogger")
+import language_tool_python
+from concurrent.futures import ThreadPoolExecutor
+
+
+class LanguageToolPool:
+    """
+    A small pool of long-lived local LanguageTool servers.
+
+    Each server is a JVM process, so starting one per document costs more than
+    the checking itself. Servers are started on first demand (up to `size`),
+    reused for every check of the run, and shut down by `close`. Checks are
+    sent from a thread pool so several servers can work at once.
+
+    Only the texts of one `check_all` call, i.e. of one document, are checked
+    concurrently: its sentences, or its chunks with `lgtool_chunk_chars`. A
+    document sent as a single chunk uses one server, so extra servers only
+    help documents with several texts. Documents themselves run in parallel
+    through `workers`, each worker process having its own pool.
+    """
+    def __init__(self, size=1, language="en-US"):
+        self.size = max(1, int(size))
+        self.language = language
+        self._idle = queue.Queue()
+        self._tools = []
+        self._lock = threading.Lock()
+        self._executor = None
+
+    def _acquire(self):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+
+        with self._lock:
+            if len(self._tools) < self.size:
+                logger.info(f"Starting LanguageTool server {len(self._tools) + 1} of {self.size}.")
+                tool = language_tool_python.LanguageTool(self.language)
+                self._tools.append(tool)
+                return tool
+
+        return self._idle.get()
+
+    def check(self, text):
+        """
+        Checks one text on an idle server.
+
+        Returns:
+            list: LanguageTool matches.
+        """
+        tool = self._acquire()
+        try:
+            return tool.check(text)
+        finally:
+            self._idle.put(tool)
+
+    def _check_or_error(self, text):
+        try:
+            return self.check(text)
+        except Exception as e:
+            return e
+
+    def check_all(self, texts):
+        """
+        Checks several texts concurrently, preserving their order.
+
+        Args:
+            texts (list of str): Texts to check.
+
+        Returns:
+            list: Per text, its matches or the exception raised while checking it.
+        """
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.size)
+        return list(self._executor.map(self._check_or_error, texts))
+
+    def close(self):
+        """
+        Shuts down the thread pool and all servers.
+        """
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+        with self._lock:
+            for tool in self._tools:
+                try:
+                    tool.close()
+                except Exception as e:
+                    logger.warning(f"Error closing LanguageTool server: {e}")
+            self._tools = []
+            self._idle = queue.Queue()
@@ -0,0 +1,144 @@
+import heapq
+from collections import Counter
+
+
+class NgramSketch:
+    """
+    Streaming corpus-wide n-gram counts, one summary per n-gram table.
+
+    Without a capacity the counts are exact, unless reloaded results had
+    pruned n-gram rows (see `update_from_results`). With a capacity each table keeps
+    a batched Space-Saving summary: n-grams are added one document at a time,
+    and once more than twice `capacity` are tracked only the `capacity` most
+    frequent are kept. The largest evicted count raises the table's floor,
+    which newly seen n-grams start from, so every reported count is an upper
+    bound on the true count and exceeds it by at most the reported error.
+    Memory stays bounded by the capacity regardless of corpus size.
+    """
+    def __init__(self, capacity=None):
+        self.capacity = int(capacity) if capacity else None
+        self.counters = {}  # table: {ngram: [count, error]}
+        self.floors = Counter()  # table: upper bound on the count of any untracked n-gram
+        self.totals = Counter()  # table: exact number of n-grams seen
+
+    def update(self, table, ngrams, counts, errors=None, floor=0):
+        """
+        Adds one batch of n-gram counts, e.g. those of a single document.
+
+        Args:
+            table (str): N-gram table name (e.g. "lex_n2grams").
+            ngrams (list of str): Distinct n-grams.
+            counts (list of int): Count of each n-gram.
+            errors (list of int): Overestimate of each count, if already approximate.
+            floor (int): Upper bound on the count of n-grams missing from the batch.
+        """
+        counters = self.counters.setdefault(table, {})
+        base = self.floors[table]
+        if errors is None:
+            errors = [0] * len(counts)
+
+        if floor:
+            # N-grams tracked here but missing from the batch may have been dropped from it.
+            batch = set(ngrams)
+            for ngram, entry in counters.items():
+                if ngram not in batch:
+                    entry[0] += floor
+                    entry[1] += floor
+
+        for ngram, count, error in zip(ngrams, counts, errors):
+            entry = counters.get(ngram)
+            if entry is None:
+                counters[ngram] = [base + count, base + error]
+            else:
+                entry[0] += count
+                entry[1] += error
+
+        self.floors[table] += floor
+        self.totals[table] += sum(counts)
+
+        if self.capacity is not None and len(counters) > 2 * self.capacity:
+            self._prune(table)
+
+    def _prune(self, table):
+        counters = self.counters[table]
+        if self.capacity is None or len(counters) <= self.capacity:
+            return
+        kept = heapq.nlargest(self.capacity + 1, counters.items(), key=lambda item: item[1][0])
+        evicted_max = kept.pop()[1][0]
+        self.counters[table] = dict(kept)
+        self.floors[table] = max(self.floors[table], evicted_max)
+
+    def merge(self, other):
+        """
+        Adds the counts of another sketch, such as one returned by a worker process.
+        """
+        for table, counters in other.counters.items():
+            ngrams = list(counters)
+            counts = [entry[0] for entry in counters.values()]
+            errors = [entry[1] for entry in counters.values()]
+            self.update(table, ngrams, counts, errors, other.floors[table])
+            # Counts above include the other sketch's errors; keep its exact total.
+            self.totals[table] += other.totals[table] - sum(counts)
+
+    def update_from_results(self, results, gran="doc", other_label=None):
+        """
+        Adds the n-gram rows of a section's results dict, for documents whose
+        results were reloaded from a checkpoint or the result cache.
+
+        Rows may have been pruned (`ngram_top_k`, `ngram_min_count`). Their
+        proportions give the document's full n-gram total, so the pruned count
+        is known; any one pruned n-gram occurred at most that often, and no more
+        often than the least frequent kept row. That bound is added as a floor,
+        so counts stay upper bounds with the overestimate in their error.
+
+        Args:
+            results (dict): {table_name: rows} as returned by an analysis.
+            gran (str): Granularity whose n-gram tables are counted.
+            other_label (str): Label of "other" rows summing the pruned n-grams.
+        """
+        suffix = f"grams_{gran}"
+        for table_name, rows in results.items():
+            if not table_name.endswith(suffix) or not isinstance(rows, list) or not rows:
+                continue
+            table = table_name[:-len(gran) - 1]
+            kept = [row for row in rows if row.get("ngram") != other_label]
+            counts = [row["count"] for row in kept]
+            total = round(rows[0]["count"] / rows[0]["proportion"])
+            pruned = total - sum(counts)
+            floor = min(pruned, min(counts)) if pruned > 0 and counts else max(pruned, 0)
+            self.update(table, [row["ngram"] for row in kept], counts, floor=floor)
+            self.totals[table] += total - sum(counts)
+
+    def top(self, table, k=None):
+        """
+        Returns the most frequent n-grams of a table.
+
+        Args:
+            table (str): N-gram table name.
+            k (int): Number of n-grams, or None for every tracked one.
+
+        Returns:
+            list of tuple: (ngram, count, error), most frequent first.
+        """
+        self._prune(table)
+        ranked = sorted(self.counters.get(table, {}).items(), key=lambda item: -item[1][0])
+        return [(ngram, count, error) for ngram, (count, error) in ranked[:k]]
+
+    def to_rows(self, k=None):
+        """
+        Builds report rows with each table's top-k n-grams and their corpus proportions.
+        """
+        rows = []
+        for table in sorted(self.counters):
+            total = self.totals[table]
+            for rank, (ngram, count, error) in enumerate(self.top(table, k), start=1):
+                rows.append({
+                    "table": table,
+                    "rank": rank,
+                    "ngram": ngram,
+                    "count": count,
+                    "max_error": error,
+                    "proportion": count / total if total else 0,
+                    "exact": self.capacity is None and not self.floors[table]
+                })
+        return rows
@@ -0,0 +1,115 @@
+import os
+import glob
+import shutil
+import logging
+logger = logging.getLogger("CustomLogger")
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+
+class ParquetBackend:
+    """
+    Streams raw table rows to Parquet as documents finish.
+
+    Rows are buffered per table (keyed by the names `Analysis.create_raw_data_tables`
+    produces) and written as row groups once `batch_rows` accumulate. Because
+    the columns of a table can differ between documents, each row group is its
+    own part file under `<table dir>/<table_name>/`. Reading a table takes the
+    union of its parts' columns.
+
+    Every run starts each table from an empty dataset (`start_tables`), also on
+    resume, since resumed runs write the rows of checkpointed documents again.
+    """
+    def __init__(self, OM, batch_rows=50000):
+        self.om = OM
+        self.batch_rows = batch_rows
+        self.buffers = {}  # table_name: [rows]
+        self.parts = {}  # table_name: number of part files written
+
+    def table_dir(self, table_name):
+        t = self.om.tables[table_name]
+        return os.path.join(t.file_path, table_name)
+
+    def start_tables(self, table_names):
+        """
+        Removes part files left by earlier runs, once per table and run.
+
+        Args:
+            table_names (iterable of str): Raw table names about to be written.
+        """
+        for name in table_names:
+            if name not in self.parts:
+                shutil.rmtree(self.table_dir(name), ignore_errors=True)
+                self.parts[name] = 0
+
+    def write(self, table_name, data):
+        """
+        Buffers a document's rows for a table, flushing a row group when full.
+
+        Args:
+            table_name (str): Raw table name.
+            data (dict or list of dict): One row or a list of rows.
+        """
+        rows = data if isinstance(data, list) else [data]
+        if not rows:
+            return
+
+        self.buffers.setdefault(table_name, []).extend(rows)
+        if len(self.buffers[table_name]) >= self.batch_rows:
+            self.flush(table_name)
+
+    def flush(self, table_name=None):
+        """
+        Writes buffered rows to a new part file, for one table or all tables.
+        """
+        table_names = [table_name] if table_name else list(self.buffers)
+
+        for name in table_names:
+            rows = self.buffers.pop(name, [])
+            if not rows:
+                continue
+
+            self.start_tables([name])
+            out_dir = self.table_dir(name)
+            os.makedirs(out_dir, exist_ok=True)
+
+            path = os.path.join(out_dir, f"part-{self.parts[name]:05d}.parquet")
+            pq.write_table(self._to_arrow(pd.DataFrame(rows)), path)
+            self.parts[name] += 1
+            logger.info(f"Wrote {len(rows)} rows of {name} to {path}")
+
+    @staticmethod
+    def _to_arrow(df):
+        try:
+            return pa.Table.from_pandas(df, preserve_index=False)
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            # Columns mixing strings and numbers are stored as strings; missing
+            # scalars stay null (list or array cells have no single truth value).
+            for col in df.columns[df.dtypes == object]:
+                df[col] = df[col].map(lambda v: None if pd.api.types.is_scalar(v) and pd.isna(v) else str(v))
+            return pa.Table.from_pandas(df, preserve_index=False)
+
+    def read_table(self, table_name):
+        """
+        Reads a table back from its part files.
+
+        Returns:
+            pd.DataFrame: All rows written for the table, or None if there are none.
+        """
+        self.flush(table_name)
+        if not self.parts.get(table_name):
+            return None
+        parts = sorted(glob.glob(os.path.join(self.table_dir(table_name), "part-*.parquet")))
+        if not parts:
+            return None
+        return pd.concat([pd.read_parquet(p) for p in parts], ignore_index=True)
+
+    def load_into_tables(self, table_names):
+        """
+        Loads written tables back into OM.tables for Excel export and downstream analyses.
+        """
+        for table_name in table_names:
+            df = self.read_table(table_name)
+            if df is not None:
+                self.om.tables[table_name].update_data(df.to_dict(orient="records"))
@@ -1,112 +1,136 @@
 import os
+import time
 import logging
+import importlib
+from collections import OrderedDict
 logger = logging.getLogger("CustomLogger")
 # from clatr.utils.OutputManager import OutputManager
 from infoscopy.utils.OutputManager import OutputManager
-# from clatr.data.preprocessing import preprocess_text
-from infoscopy.nlp_utils.preprocessing import preprocess_text
-from clatr.analyses.graphemes import analyze_graphemes
-from clatr.analyses.lexicon import analyze_lexicon
-from clatr.analyses.morphology import analyze_morphology
-from clatr.analyses.syntax import analyze_syntax
-from clatr.analyses.phonology import analyze_phonology
-from clatr.analyses.semantics import analyze_semantics
-from clatr.analyses.mechanics import analyze_mechanics
-
-OM = OutputManager()
-ngrams = OM.config.get("ngrams", 5)
-
-# Section configuration: mapping section name to analysis function + raw table structure
-SECTION_CONFIG = {
-
-    "preprocessing": (
-        preprocess_text,
-        {
-            "preprocessed": [
-                "sample_data", "sample_text"
-            ]
-        }
-    ),
-
-    "graphemes": (
-        analyze_graphemes,
-        {
-            "grapheme_stats": [
-                "grapheme_basic_specs", "grapheme_counts", "grapheme_props",
-                "grapheme_modes", "word_counts", "word_props"
-            ],
-            
-            "grapheme_ngrams": [
-                "grapheme_ngram_summary"
-            ] + [f"grapheme_n{n}grams" for n in range(1, ngrams + 1)]
-        }
-    ),
-    
-    "lexicon": (
-        analyze_lexicon, 
-        {
-            "lex_measures": [
-                "freqs_cleaned", "freqs_tokenized", "richness_cleaned",
-                "richness_tokenized", "named_entities", "readability"
-            ],
-            
-            "lex_ngrams": [
-                "lex_ngram_summary"
-            ] + [f"lex_n{n}grams" for n in range(1, ngrams + 1)]
-        }
-    ),
-    
-    "morphology": (
-        analyze_morphology,
-        {
-            "morph_stats": [
-                "morpheme_basic_specs", "morph_tag_counts", "morph_tag_props", "morph_tags_commonest",
-                 "morph_tag_sets_commonest", "pos_tag_counts", "pos_tag_props", "pos_tags_commonest"
-            ],
-
-            "pos_ngrams": [
-                "pos_ngram_summary"
-            ] + [f"pos_n{n}grams" for n in range(1, ngrams + 1)]
-        }
-    ),
-    
-    "syntax": (
-        analyze_syntax,
-        {
-            "syntax_measures": [
-                "syn_trees", "dep_tag_counts", "dep_tag_props", "dep_tags_commonest", "tree_comp"
-            ]
-        }
-    ),
-    
-    "phonology": (
-        analyze_phonology,
-        {
-            "phoneme_stats": [
-                "syllable_stats", "phoneme_basic_specs", "phoneme_counts", "phoneme_props", "phoneme_commonest",
-                "phon_feature_counts", "phon_feature_props", "word_lens_counts", "word_lens_props"
-            ]
-        }
-    ),
-    
-    "semantics": (
-        analyze_semantics,
-        {
-            "semantic_data": [
-                "unit_sim", "NRCLex", "VADER", "TextBlob", "Afinn", "topics"
-            ]
-        }
-    ),
-    
-    "mechanics": (
-        analyze_mechanics,
-        {
-            "errors": [
-                "lg_tool"
-            ]
-        }
-    )
-}
+# from clatr.utils.NLPmodel import NLPmodel
+from infoscopy.nlp_utils.NLPmodel import NLPmodel
+from clatr import __version__
+from clatr.utils.ResultCache import ResultCache, source_digest
+from clatr.utils.NgramSketch import NgramSketch
+from clatr.utils.profiling import profiled, pop_metric_timings, rss_mb, process_peak_rss_mb, count_tokens
+
+# Config keys that change section results, and hence the result cache keys
+CACHE_CONFIG_KEYS = [
+    "sentence_level", "ngrams", "dep_trees", "max_tree_pairs", "tree_pair_seed",
+    "ngram_top_k", "ngram_min_count", "ngram_other_bucket"
+]
+
+# Installed packages whose code, data or models change section results
+# (infoscopy supplies preprocessing and the proportion/most-common helpers)
+CACHE_DEPENDENCIES = [
+    "infoscopy", "wordfreq", "g2p-en", "nltk", "language-tool-python", "textstat",
+    "py-readability-metrics", "dendropy", "zss", "benepar", "vaderSentiment",
+    "NRCLex", "textblob", "afinn", "scikit-learn", "numpy", "scipy"
+]
+
+def get_section_config(ngrams=5):
+    """
+    Builds the section configuration for a given maximum n-gram length.
+
+    Analysis functions are given as (module, function name) and only imported
+    for enabled sections, so unused sections never load their dependencies.
+
+    Args:
+        ngrams (int): Maximum n-gram length.
+
+    Returns:
+        dict: {section: ((module, function name), raw table structure)}
+    """
+    return {
+
+        "preprocessing": (
+            # ("clatr.data.preprocessing", "preprocess_text"),
+            ("infoscopy.nlp_utils.preprocessing", "preprocess_text"),
+            {
+                "preprocessed": [
+                    "sample_data", "sample_text"
+                ]
+            }
+        ),
+
+        "graphemes": (
+            ("clatr.analyses.graphemes", "analyze_graphemes"),
+            {
+                "grapheme_stats": [
+                    "grapheme_basic_specs", "grapheme_counts", "grapheme_props",
+                    "grapheme_modes", "word_counts", "word_props"
+                ],
+
+                "grapheme_ngrams": [
+                    "grapheme_ngram_summary"
+                ] + [f"grapheme_n{n}grams" for n in range(1, ngrams + 1)]
+            }
+        ),
+
+        "lexicon": (
+            ("clatr.analyses.lexicon", "analyze_lexicon"),
+            {
+                "lex_measures": [
+                    "freqs_cleaned", "freqs_tokenized", "richness_cleaned",
+                    "richness_tokenized", "named_entities", "readability"
+                ],
+
+                "lex_ngrams": [
+                    "lex_ngram_summary"
+                ] + [f"lex_n{n}grams" for n in range(1, ngrams + 1)]
+            }
+        ),
+
+        "morphology": (
+            ("clatr.analyses.morphology", "analyze_morphology"),
+            {
+                "morph_stats": [
+                    "morpheme_basic_specs", "morph_tag_counts", "morph_tag_props", "morph_tags_commonest",
+                     "morph_tag_sets_commonest", "pos_tag_counts", "pos_tag_props", "pos_tags_commonest"
+                ],
+
+                "pos_ngrams": [
+                    "pos_ngram_summary"
+                ] + [f"pos_n{n}grams" for n in range(1, ngrams + 1)]
+            }
+        ),
+
+        "syntax": (
+            ("clatr.analyses.syntax", "analyze_syntax"),
+            {
+                "syntax_measures": [
+                    "syn_trees", "dep_tag_counts", "dep_tag_props", "dep_tags_commonest", "tree_comp"
+                ]
+            }
+        ),
+
+        "phonology": (
+            ("clatr.analyses.phonology", "analyze_phonology"),
+            {
+                "phoneme_stats": [
+                    "syllable_stats", "phoneme_basic_specs", "phoneme_counts", "phoneme_props", "phoneme_commonest",
+                    "phon_feature_counts", "phon_feature_props", "word_lens_counts", "word_lens_props"
+                ]
+            }
+        ),
+
+        "semantics": (
+            ("clatr.analyses.semantics", "analyze_semantics"),
+            {
+                "semantic_data": [
+                    "unit_sim", "NRCLex", "VADER", "TextBlob", "Afinn", "topics"
+                ]
+            }
+        ),
+
+        "mechanics": (
+            ("clatr.analyses.mechanics", "analyze_mechanics"),
+            {
+                "errors": [
+                    "lg_tool"
+                ]
+            }
+        )
+    }
 
 class PipelineManager:
     _instance = None
@@ -126,43 +150,417 @@ class PipelineManager:
         self.sentence_level = OM.config.get("sentence_level", False)
         self.visualize = OM.visualize
         self.dep_trees = OM.config.get("dep_trees", False)
+        self.workers = max(1, int(OM.config.get("workers", 1) or 1))
+        self.schedule = OM.config.get("schedule", "section")
+        if self.schedule not in ("section", "document"):
+            logger.warning(f"Unknown schedule '{self.schedule}' - using 'section'.")
+            self.schedule = "section"
         self.granularities = ["doc", "sent"] if self.sentence_level else ["doc"]
+        self.ngrams = OM.config.get("ngrams", 5)
+        self.ngram_top_k = OM.config.get("ngram_top_k")
+        self.ngram_min_count = OM.config.get("ngram_min_count")
+        self.ngram_other_bucket = OM.config.get("ngram_other_bucket", False)
+        self.corpus_ngram_top_k = OM.config.get("corpus_ngram_top_k", 100)
+        self.ngram_sketch = None  # corpus-wide n-gram counts, fed by compute_ngrams
+        if OM.config.get("corpus_ngrams", False):
+            self.ngram_sketch = NgramSketch(OM.config.get("corpus_ngram_capacity"))
         self.sections = {}  # section_name: Analysis instance
-        self._init_analyses(SECTION_CONFIG)
+        self._init_analyses(get_section_config(self.ngrams))
         self.analyses = {k for k in self.sections if OM.sections.get(k, False)}
-        self.ngrams = ngrams  # You might want to pass this in
         self.ngram_id_sent = 1
         self.ngram_id_doc = 1
+        self.checkpoint = OM.config.get("checkpoint", True)
+        self.output_format = OM.config.get("output_format", "excel")
+        self.export_excel = OM.config.get("export_excel", self.output_format == "excel")
+        self.parquet_batch_rows = int(OM.config.get("parquet_batch_rows", 50000))
+        self.ngram_matrix = OM.config.get("ngram_matrix", True)
+        self.parse_batch_size = int(OM.config.get("parse_batch_size", 64))
+        self.parsed_docs = {}  # (doc_id, sent_id, variant, model): (text, Doc)
+        max_docs = OM.config.get("max_parsed_docs", 64)
+        self.max_parsed_docs = max(1, int(max_docs)) if max_docs is not None else None
+        self._doc_lru = OrderedDict()  # doc_ids with stored Docs, least recently used first
+        self._sample_index = None  # doc_id: sample record(s), built on first lookup
+        self.record_timings = OM.config.get("timings", True)
+        self.timings = []  # one row per (section, doc_id) run
+        self.lgtool_servers = max(1, int(OM.config.get("lgtool_servers", 1) or 1))
+        self.lgtool_chunk_chars = int(OM.config.get("lgtool_chunk_chars", 0) or 0)
+        self._lgtool_pool = None  # started when the mechanics section first needs it
+        self.tree_workers = max(1, int(OM.config.get("tree_workers", 1) or 1))
+        max_tree_pairs = OM.config.get("max_tree_pairs")
+        self.max_tree_pairs = int(max_tree_pairs) if max_tree_pairs is not None else None
+        self.tree_pair_seed = int(OM.config.get("tree_pair_seed", 0))
+        self._tree_pool = None  # started when the syntax section first needs it
+        self.pron_cache_path = OM.config.get("pron_cache_path")
+        self.syllable_table_dir = OM.config.get("syllable_table_dir")
+        self._pron_cache = None
+        self.word_freq_cache_path = OM.config.get("word_freq_cache_path")
+        self._word_freq_cache = None
+        self.result_cache = None
+        self._cache_settings = None
+        if OM.config.get("result_cache", False):
+            max_mb = OM.config.get("cache_max_mb")
+            self.result_cache = ResultCache(
+                OM.config.get("cache_dir", os.path.join("clatr_data", "cache")),
+                int(max_mb * 1024 ** 2) if max_mb is not None else None
+            )
 
         self._initialized = True  # Mark as initialized
 
     def _init_analyses(self, section_dict):
-        for section, (func, table_structure) in section_dict.items():
+        for section, (func_path, table_structure) in section_dict.items():
             if section == "preprocessing" or self.om.sections.get(section, False):
                 analysis = Analysis(self.om, section, self.granularities)
-                analysis.func = func
+                analysis.func_path = func_path
                 analysis.table_bases = table_structure
                 self.sections[section] = analysis
     
     def run_preprocessing(self):
+        self._sample_index = None
         return self.sections["preprocessing"].func(self)
 
     def run_section(self, section, sample_data):
         # self.sections[section].create_raw_data_tables()
         self.ngram_id_sent = self.ngram_id_doc = 1
-        return self.sections[section].func(self, sample_data)
+
+        if not self.record_timings:
+            return self._run_section(section, sample_data)[0]
+
+        pop_metric_timings()  # Discard anything recorded outside a section run.
+        rss_start = rss_mb()
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+
+        results, cached = self._run_section(section, sample_data)
+        rss_end = rss_mb()
+
+        record = sample_data[0] if isinstance(sample_data, list) else sample_data
+        row = {
+            "doc_id": record.get("doc_id"),
+            "section": section,
+            "wall_s": time.perf_counter() - wall_start,
+            "cpu_s": time.process_time() - cpu_start,
+            "num_tokens": count_tokens(sample_data),
+            "rss_mb": rss_end,
+            "rss_delta_mb": rss_end - rss_start if rss_end is not None and rss_start is not None else None,
+            "process_peak_rss_mb": process_peak_rss_mb(),
+            "cached": cached,
+        }
+        row.update(pop_metric_timings())
+        self.timings.append(row)
+        return results
+
+    def _run_section(self, section, sample_data):
+        """
+        Runs a section's analysis, going through the result cache if enabled.
+
+        Returns:
+            tuple: (results dict, whether the results came from the cache)
+        """
+        if self.result_cache is None:
+            return self.sections[section].func(self, sample_data), False
+
+        granularity = "sent" if self.sentence_level else "doc"
+        key = self.result_cache.make_key(section, granularity, sample_data, self.get_cache_settings(section))
+        results = self.result_cache.get(key)
+        if results is not None:
+            logger.info(f"Using cached {section} results.")
+            self.add_reloaded_ngrams(results)
+            return results, True
+
+        results = self.sections[section].func(self, sample_data)
+        if results:
+            self.result_cache.put(key, results)
+        return results, False
+
+    def add_reloaded_ngrams(self, results):
+        """
+        Counts the document-level n-gram rows of cached or checkpointed results
+        into the corpus sketch, since compute_ngrams did not see them this run.
+        """
+        if self.ngram_sketch is not None and results:
+            from clatr.analyses.ngrams import OTHER_NGRAM
+            self.ngram_sketch.update_from_results(results, "doc", OTHER_NGRAM)
+
+    def pop_ngram_sketch(self):
+        """
+        Returns the corpus n-gram sketch and starts a new one, or None if disabled.
+        Worker processes send theirs to the main process after each document.
+        """
+        sketch = self.ngram_sketch
+        if sketch is not None:
+            self.ngram_sketch = NgramSketch(sketch.capacity)
+        return sketch
+
+    def pop_timings(self):
+        """
+        Returns and clears the timing rows recorded so far.
+        """
+        timings, self.timings = self.timings, []
+        return timings
+
+    def get_language_tool(self):
+        """
+        Returns the run's LanguageTool server pool, starting it on first use.
+        """
+        if self._lgtool_pool is None:
+            from clatr.utils.LanguageToolPool import LanguageToolPool
+            self._lgtool_pool = LanguageToolPool(self.lgtool_servers)
+        return self._lgtool_pool
+
+    def get_tree_pool(self):
+        """
+        Returns the process pool for pairwise tree distances, or None if `tree_workers` is 1.
+        """
+        if self._tree_pool is None and self.tree_workers > 1:
+            from concurrent.futures import ProcessPoolExecutor
+            self._tree_pool = ProcessPoolExecutor(max_workers=self.tree_workers)
+        return self._tree_pool
+
+    def get_ngram_limits(self, table, prefix):
+        """
+        Returns the (top_k, min_count, other_bucket) pruning settings for an n-gram table.
+
+        Each option is either a single value or a dict keyed by table name
+        (e.g. "lex_n2grams") or prefix (e.g. "lex"), the table name taking precedence.
+
+        Args:
+            table (str): N-gram table name without granularity suffix.
+            prefix (str): Table prefix ("grapheme", "lex", "pos").
+        """
+        def resolve(option):
+            if isinstance(option, dict):
+                return option.get(table, option.get(prefix))
+            return option
+
+        return resolve(self.ngram_top_k), resolve(self.ngram_min_count), bool(resolve(self.ngram_other_bucket))
+
+    def get_pronunciation_cache(self):
+        """
+        Returns the process-wide pronunciation cache used by the phonology section.
+        """
+        if self._pron_cache is None:
+            from clatr.utils.PronunciationCache import PronunciationCache
+            self._pron_cache = PronunciationCache(self.pron_cache_path, self.syllable_table_dir)
+        return self._pron_cache
+
+    def get_word_freq_cache(self):
+        """
+        Returns the process-wide word frequency cache used by the lexicon section.
+        """
+        if self._word_freq_cache is None:
+            from clatr.utils.WordFreqCache import WordFreqCache
+            self._word_freq_cache = WordFreqCache(self.word_freq_cache_path)
+        return self._word_freq_cache
+
+    def close(self):
+        """
+        Releases resources held for the run: parsed Docs, LanguageTool servers
+        and the tree-distance pool. Pronunciations and word frequencies are
+        saved if cache files are configured.
+        """
+        self.release_docs()
+        if self._lgtool_pool is not None:
+            self._lgtool_pool.close()
+            self._lgtool_pool = None
+        if self._tree_pool is not None:
+            self._tree_pool.shutdown()
+            self._tree_pool = None
+        if self._pron_cache is not None:
+            self._pron_cache.save()
+        if self._word_freq_cache is not None:
+            self._word_freq_cache.save()
+
+    def get_cache_settings(self, section=None):
+        """
+        Returns the config values, dependency and model versions, and (for a
+        section) the digest of its analysis source that key the result cache.
+        """
+        if self._cache_settings is None:
+            import spacy
+            from importlib.metadata import version, PackageNotFoundError
+
+            def installed_version(package):
+                try:
+                    return version(package)
+                except PackageNotFoundError:
+                    return None
+
+            nlp = NLPmodel().get_nlp()
+            self._cache_settings = {
+                "config": {k: self.om.config.get(k) for k in CACHE_CONFIG_KEYS},
+                "clatr": __version__,
+                "spacy": spacy.__version__,
+                "model": f"{nlp.meta.get('lang')}_{nlp.meta.get('name')}-{nlp.meta.get('version')}",
+                "pipeline": list(nlp.pipe_names),
+                "dependencies": {p: installed_version(p) for p in CACHE_DEPENDENCIES},
+                "code": {},  # section: source digest, filled on first use
+            }
+
+        settings = self._cache_settings
+        if section is None:
+            return {k: v for k, v in settings.items() if k != "code"}
+        if section not in settings["code"]:
+            settings["code"][section] = source_digest(self.sections[section].func_path[0])
+        return {**{k: v for k, v in settings.items() if k != "code"}, "code": settings["code"][section]}
+
+    @profiled
+    def get_doc(self, doc_id, text, variant="cleaned", sent_id=None, model=None):
+        """
+        Returns the spaCy Doc for a sample text, parsing it only on first request.
+
+        Docs are shared by all sections and keyed by (doc_id, sent_id, text
+        variant, model). A cached Doc is only reused if its text matches, so
+        differently assembled texts never collide. Docs of at most
+        `max_parsed_docs` documents are kept; the least recently used are dropped.
+
+        Args:
+            doc_id: Document identifier.
+            text (str): Text to parse.
+            variant (str): Name of the text variant (e.g. 'cleaned', 'semantic').
+            sent_id: Sentence identifier, or None for document-level texts.
+            model (str): spaCy model name, or None for the default model.
+
+        Returns:
+            spacy.tokens.Doc: The parsed document.
+        """
+        key = (doc_id, sent_id, variant, model)
+        self._touch_doc(doc_id)
+        cached = self.parsed_docs.get(key)
+        if cached is not None and cached[0] == text:
+            return cached[1]
+
+        NLP = NLPmodel()
+        nlp = NLP.get_nlp(model) if model else NLP.get_nlp()
+        doc = nlp(text)
+        self.parsed_docs[key] = (text, doc)
+        return doc
+
+    @profiled
+    def get_sent_docs(self, sample_data, fields=("cleaned",), model=None):
+        """
+        Returns the spaCy Docs for all sentences of a document, parsed in one batch.
+
+        Sentences already in the store are reused; the rest are parsed together
+        with nlp.pipe using the configured `parse_batch_size`.
+
+        Args:
+            sample_data (list of dict): Sentence records of one document.
+            fields (tuple): Text fields in order of preference; the first
+                non-empty one is used for each sentence.
+            model (str): spaCy model name, or None for the default model.
+
+        Returns:
+            list: One spacy.tokens.Doc per sentence, in the order given.
+        """
+        keys, texts, docs = [], [], []
+        if sample_data:
+            self._touch_doc(sample_data[0].get("doc_id"))
+        for sent in sample_data:
+            field = next((f for f in fields if sent.get(f, "")), fields[-1])
+            text = sent.get(field, "")
+            key = (sent.get("doc_id"), sent.get("sent_id"), field, model)
+            cached = self.parsed_docs.get(key)
+            keys.append(key)
+            texts.append(text)
+            docs.append(cached[1] if cached is not None and cached[0] == text else None)
+
+        pending = [i for i, doc in enumerate(docs) if doc is None]
+        if pending:
+            NLP = NLPmodel()
+            nlp = NLP.get_nlp(model) if model else NLP.get_nlp()
+            parsed = nlp.pipe((texts[i] for i in pending), batch_size=self.parse_batch_size)
+            for i, doc in zip(pending, parsed):
+                docs[i] = doc
+                self.parsed_docs[keys[i]] = (texts[i], doc)
+
+        return docs
+
+    @profiled
+    def get_joined_doc(self, sample_data, fields=("cleaned",), model=None):
+        """
+        Returns a document-level Doc assembled from a document's sentence Docs.
+
+        The sentence Docs come from `get_sent_docs`, so each sentence is parsed
+        only once and its boundaries carry over to the combined Doc.
+
+        Args:
+            sample_data (list of dict): Sentence records of one document.
+            fields (tuple): Text fields in order of preference per sentence.
+            model (str): spaCy model name, or None for the default model.
+
+        Returns:
+            spacy.tokens.Doc: The combined document.
+        """
+        sent_docs = self.get_sent_docs(sample_data, fields, model)
+        text = " ".join(doc.text for doc in sent_docs)
+        key = (sample_data[0].get("doc_id"), None, "|".join(fields) + "_sents", model)
+        cached = self.parsed_docs.get(key)
+        if cached is not None and cached[0] == text:
+            return cached[1]
+
+        from spacy.tokens import Doc
+        doc = Doc.from_docs(sent_docs)
+        self.parsed_docs[key] = (text, doc)
+        return doc
+
+    def _touch_doc(self, doc_id):
+        """
+        Marks a document's Docs as most recently used, dropping the least
+        recently used documents beyond `max_parsed_docs`.
+        """
+        self._doc_lru[doc_id] = None
+        self._doc_lru.move_to_end(doc_id)
+        if self.max_parsed_docs is None:
+            return
+        while len(self._doc_lru) > self.max_parsed_docs:
+            self.release_docs(next(iter(self._doc_lru)))
+
+    def release_docs(self, doc_id=None):
+        """
+        Drops parsed Docs from the store, either for one document or all of them.
+        """
+        if doc_id is None:
+            self.parsed_docs.clear()
+            self._doc_lru.clear()
+        else:
+            for key in [k for k in self.parsed_docs if k[0] == doc_id]:
+                del self.parsed_docs[key]
+            self._doc_lru.pop(doc_id, None)
 
     def get_fact_table_name(self):
         return "sample_text_sent" if self.sentence_level else "sample_text_doc"
 
     def get_sample_data(self, doc_id):
+        """
+        Returns a document's sample data: its sentence records in sent_id order
+        if sentence-level, otherwise its single document record.
+        """
+        if self._sample_index is None:
+            self._sample_index = self._build_sample_index()
+        return self._sample_index.get(doc_id, [] if self.sentence_level else {})
+
+    def _build_sample_index(self):
+        """
+        Groups the fact table by doc_id once so every lookup is a dict access.
+
+        Returns:
+            dict: doc_id -> list of sentence records (sentence-level) or the
+                document's record (document-level).
+        """
         fact_table = self.get_fact_table_name()
-        sample_data = self.om.tables[fact_table].get_data(filters={"doc_id":doc_id})
+        df = self.om.tables[fact_table].get_data()
+        index = {}
+
         if self.sentence_level: # and section != "mechanics":
-            sample_data = sample_data.sort_values(by='sent_id').to_dict(orient="records")
+            df = df.sort_values(by=["doc_id", "sent_id"], kind="stable")
+            for record in df.to_dict(orient="records"):
+                index.setdefault(record["doc_id"], []).append(record)
         else:
-            sample_data = sample_data.to_dict(orient="records")[0]
-        return sample_data
+            for record in df.to_dict(orient="records"):
+                index.setdefault(record["doc_id"], record)
+
+        logger.info(f"Indexed {len(index)} documents from {fact_table}.")
+        return index
 
 
 class Analysis:
@@ -172,10 +570,25 @@ class Analysis:
     def __init__(self, OM: OutputManager, name: str, granularities: list):
         self.om = OM
         self.name = name
-        self.func = None
+        self.func_path = None  # (module, function name)
+        self._func = None
         self.granularities = granularities
         self.table_bases = {}  # file_name_base: [table_name_bases]
 
+    @property
+    def func(self):
+        """
+        The section's analysis function, imported on first use.
+        """
+        if self._func is None and self.func_path is not None:
+            module, func_name = self.func_path
+            self._func = getattr(importlib.import_module(module), func_name)
+        return self._func
+
+    @func.setter
+    def func(self, func):
+        self._func = func
+
     def create_raw_data_tables(self, tags=["raw"]):
         """
         Creates OutputManager tables for raw data per granularity.
@@ -191,8 +604,11 @@ class Analysis:
                     table_name = f"{table}_{gran}"
                     file_name = f"{file_base}_{gran}.xlsx"
 
+                    # N-gram tables are long-form; their doc-by-ngram view is
+                    # exported as a sparse matrix (see clatr.data.ngram_matrix),
+                    # or pivoted by OutputManager if the matrix export is off.
                     if table.endswith("grams"):
-                        pivot = {
+                        pivot = None if self.om.config.get("ngram_matrix", True) else {
                             "index": "doc_id", "columns": "ngram", "values": "prop"
                         }
                         primary_keys = ["ngram_id"]
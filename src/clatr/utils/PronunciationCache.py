@@ -0,0 +1,133 @@
+import os
+import re
+import json
+import logging
+logger = logging.getLogger("CustomLogger")
+# from clatr.utils.NLPmodel import NLPmodel
+from infoscopy.nlp_utils.NLPmodel import NLPmodel
+
+# Words g2p_en passes through its normalization unchanged
+PLAIN_WORD = re.compile(r"[a-z]+")
+
+
+class PronunciationCache:
+    """
+    Process-wide memo of word pronunciations.
+
+    Each word is resolved once per process and gets exactly the phonemes
+    `G2p()(word)` would return. Plain words in the CMU dictionary are looked
+    up directly. Homographs, and words g2p_en would normalize, go through the
+    full G2p call so its POS-based homograph choice is kept. The remaining
+    out-of-vocabulary words are predicted one at a time by the shared G2P model.
+    With `cache_path`, pronunciations are loaded from and saved to a JSON file.
+    Syllable and stress counts come from a precompiled `SyllableTable`, kept
+    in `table_dir` if given.
+
+    The first construction fixes `cache_path` and `table_dir` for the process;
+    later constructions with other paths get the same instance and a warning.
+    """
+    _instance = None
+    _initialized = False
+
+    def __new__(cls, cache_path=None, table_dir=None):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+        return cls._instance
+
+    def __init__(self, cache_path=None, table_dir=None):
+        if self._initialized:
+            for name, value in (("cache_path", cache_path), ("table_dir", table_dir)):
+                if value is not None and value != getattr(self, name):
+                    logger.warning(f"PronunciationCache already uses {name}={getattr(self, name)!r}; "
+                                   f"ignoring {name}={value!r}.")
+            return
+
+        self.cache_path = cache_path
+        self.table_dir = table_dir
+        self.prons = {}  # word: list of phonemes
+        self._g2p = None
+        self._cmu = None
+        self._syllable_table = None
+        self._num_loaded = 0
+        if cache_path and os.path.exists(cache_path):
+            self.prons.update(self._read(cache_path))
+            self._num_loaded = len(self.prons)
+            logger.info(f"Loaded {self._num_loaded} pronunciations from {cache_path}")
+
+        self._initialized = True
+
+    @property
+    def g2p(self):
+        """The process's G2p model, loaded on first use."""
+        if self._g2p is None:
+            from g2p_en import G2p
+            self._g2p = G2p()
+        return self._g2p
+
+    @property
+    def cmu(self):
+        """The CMU Pronouncing Dictionary: {word: [pronunciations]}."""
+        if self._cmu is None:
+            self._cmu = NLPmodel().get_cmu_dict()
+        return self._cmu
+
+    @property
+    def syllable_table(self):
+        """The precompiled syllable and stress table, built or loaded on first use."""
+        if self._syllable_table is None:
+            from clatr.utils.SyllableTable import SyllableTable
+            self._syllable_table = SyllableTable.load_or_build(lambda: self.cmu, self.table_dir)
+        return self._syllable_table
+
+    def lookup(self, words):
+        """
+        Returns the pronunciation of each word, resolving each unseen word once.
+
+        Args:
+            words (list of str): Lowercased words.
+
+        Returns:
+            list of list: Phonemes per word, in the order given.
+        """
+        missing = [w for w in dict.fromkeys(words) if w not in self.prons]
+        if missing:
+            self._resolve(missing)
+        return [self.prons[w] for w in words]
+
+    def _resolve(self, words):
+        g2p = self.g2p
+        for word in words:
+            if PLAIN_WORD.fullmatch(word) and word not in g2p.homograph2features:
+                if word in g2p.cmu:
+                    self.prons[word] = g2p.cmu[word][0]
+                else:
+                    self.prons[word] = g2p.predict(word)
+            else:
+                self.prons[word] = g2p(word)
+
+    @staticmethod
+    def _read(path):
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable pronunciation cache {path}: {e}")
+            return {}
+
+    def save(self):
+        """
+        Writes the pronunciations to `cache_path`, merged with what is already there.
+        """
+        if not self.cache_path or len(self.prons) == self._num_loaded:
+            return
+
+        prons = self._read(self.cache_path) if os.path.exists(self.cache_path) else {}
+        prons.update(self.prons)
+
+        os.makedirs(os.path.dirname(self.cache_path) or ".", exist_ok=True)
+        tmp_path = f"{self.cache_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(prons, f)
+        os.replace(tmp_path, self.cache_path)
+        self._num_loaded = len(self.prons)
+        logger.info(f"Saved {len(prons)} pronunciations to {self.cache_path}")
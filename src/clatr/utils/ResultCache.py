@@ -0,0 +1,246 @@
+import os
+import ast
+import json
+import pickle
+import hashlib
+import logging
+import importlib.util
+logger = logging.getLogger("CustomLogger")
+
+
+def source_digest(module_name, package="clatr"):
+    """
+    Hashes the source of a module and every `package` module it imports,
+    directly or transitively (including imports inside functions).
+
+    Keys the result cache on the analysis code itself, so editing a section
+    or a helper it uses invalidates that section's cached results.
+
+    Args:
+        module_name (str): Dotted module name, e.g. "clatr.analyses.lexicon".
+        package (str): Top-level package whose modules are followed.
+
+    Returns:
+        str: Hex digest over the sources, in module-name order.
+    """
+    root = os.path.dirname(os.path.dirname(importlib.util.find_spec(package).origin))
+
+    def source_path(name):
+        """Returns (path, is_package) of a module's source file without importing it."""
+        base = os.path.join(root, *name.split("."))
+        if os.path.isfile(os.path.join(base, "__init__.py")):
+            return os.path.join(base, "__init__.py"), True
+        return (f"{base}.py", False) if os.path.isfile(f"{base}.py") else (None, False)
+
+    sources = {}
+    pending = [module_name]
+    while pending:
+        name = pending.pop()
+        path, is_package = source_path(name)
+        if name in sources or path is None:
+            continue
+        with open(path, "rb") as f:
+            sources[name] = f.read()
+
+        base = name if is_package else name.rpartition(".")[0]
+        for node in ast.walk(ast.parse(sources[name])):
+            if isinstance(node, ast.Import):
+                candidates = [alias.name for alias in node.names]
+            elif isinstance(node, ast.ImportFrom):
+                parent = node.module or ""
+                if node.level:
+                    anchor = base.rsplit(".", node.level - 1)[0] if node.level > 1 else base
+                    parent = f"{anchor}.{parent}" if parent else anchor
+                # `from pkg import name` may import a submodule called name.
+                candidates = [parent] + [f"{parent}.{alias.name}" for alias in node.names]
+            else:
+                continue
+            pending.extend(c for c in candidates if c.split(".")[0] == package and c not in sources)
+
+    digest = hashlib.sha256()
+    for name in sorted(sources):
+        digest.update(name.encode("utf-8") + b"\0" + sources[name])
+    return digest.hexdigest()
+
+
+class ResultCache:
+    """
+    Content-addressed on-disk cache of per-document section results.
+
+    Each entry is the pickled results dict of one `analyze_*` call, stored under
+    the SHA-256 of its inputs (section, granularity, sample records, relevant
+    config and model versions). Unchanged documents are therefore served from
+    disk on re-runs, while new or edited documents miss and are analyzed.
+    Least recently used entries are evicted once the cache exceeds `max_bytes`.
+    """
+    def __init__(self, cache_dir, max_bytes=None):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self._size = sum(size for _, size, _ in self._entries())
+
+    @staticmethod
+    def make_key(section, granularity, sample_data, settings):
+        """
+        Hashes the inputs that determine a section's results for one document.
+
+        Args:
+            section (str): Section name.
+            granularity (str): 'doc' or 'sent'.
+            sample_data (dict or list of dict): The document's sample records.
+            settings (dict): Relevant config values and model versions.
+
+        Returns:
+            str: Hex digest identifying the cache entry.
+        """
+        payload = json.dumps(
+            {"section": section, "granularity": granularity,
+             "sample_data": sample_data, "settings": settings},
+            sort_keys=True, default=str
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key[:2], f"{key}.pkl")
+
+    def _entries(self):
+        """Yields (path, size, last access time) for every cache entry."""
+        for root, _, files in os.walk(self.cache_dir):
+            for file in files:
+                if file.endswith(".pkl"):
+                    path = os.path.join(root, file)
+                    try:
+                        st = os.stat(path)
+                    except OSError:
+                        continue
+                    yield path, st.st_size, st.st_mtime
+
+    def get(self, key):
+        """
+        Returns the cached results for a key, or None on a miss.
+        """
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                results = pickle.load(f)
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        except Exception as e:
+            logger.warning(f"Discarding unreadable cache entry {path}: {e}")
+            self.misses += 1
+            return None
+
+        os.utime(path)  # Mark as recently used for eviction.
+        self.hits += 1
+        return results
+
+    def put(self, key, results):
+        """
+        Stores results under a key, evicting old entries if over the size limit.
+        """
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                pickle.dump(results, f, protocol=pickle.HIGHEST_PROTOCOL)
+            # An overwritten entry's old size no longer counts.
+            old_size = os.path.getsize(path) if os.path.exists(path) else 0
+            os.replace(tmp_path, path)
+        except Exception as e:
+            logger.warning(f"Failed to write cache entry {path}: {e}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return
+
+        self._size += os.path.getsize(path) - old_size
+        if self.max_bytes is not None and self._size > self.max_bytes:
+            self.prune()
+
+    def stats(self):
+        """
+        Summarizes the cache contents.
+
+        Returns:
+            dict: Entry count, total size and limits.
+        """
+        entries = list(self._entries())
+        return {
+            "cache_dir": self.cache_dir,
+            "entries": len(entries),
+            "size_bytes": sum(size for _, size, _ in entries),
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+    def prune(self, max_bytes=None):
+        """
+        Evicts least recently used entries until the cache fits the size limit.
+
+        Args:
+            max_bytes (int): Target size; defaults to the cache's `max_bytes`.
+                A target of 0 empties the cache.
+
+        Returns:
+            int: Number of entries removed.
+        """
+        max_bytes = self.max_bytes if max_bytes is None else max_bytes
+        entries = sorted(self._entries(), key=lambda e: e[2])
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+
+        if max_bytes is not None:
+            for path, size, _ in entries:
+                if total <= max_bytes:
+                    break
+                try:
+                    os.remove(path)
+                except OSError:
+                    continue
+                total -= size
+                removed += 1
+
+        self._size = total
+        if removed:
+            logger.info(f"Evicted {removed} cache entries from {self.cache_dir}.")
+        return removed
+
+
+def run_cache_command(args):
+    """
+    Handles the `clatr cache stats|prune` command line.
+    """
+    import yaml
+
+    config = {}
+    if os.path.exists(args.config):
+        with open(args.config, "r") as f:
+            config = yaml.safe_load(f) or {}
+
+    cache_dir = args.cache_dir or config.get("cache_dir", os.path.join("clatr_data", "cache"))
+    max_mb = args.max_mb if getattr(args, "max_mb", None) is not None else config.get("cache_max_mb")
+    max_bytes = int(max_mb * 1024 ** 2) if max_mb is not None else None
+
+    if not os.path.isdir(cache_dir):
+        print(f"No cache found at {cache_dir}.")
+        return
+
+    cache = ResultCache(cache_dir, max_bytes)
+
+    if args.cache_command == "prune":
+        if max_bytes is None:
+            print("No size limit given; use --max-mb or set cache_max_mb in the config.")
+            return
+        removed = cache.prune()
+        print(f"Removed {removed} entries.")
+
+    stats = cache.stats()
+    print(f"Cache directory: {stats['cache_dir']}")
+    print(f"Entries: {stats['entries']}")
+    print(f"Size: {stats['size_bytes'] / 1024 ** 2:.1f} MB")
+    if stats["max_bytes"] is not None:
+        print(f"Limit: {stats['max_bytes'] / 1024 ** 2:.1f} MB")
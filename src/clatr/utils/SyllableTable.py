@@ -0,0 +1,94 @@
+import os
+import numpy as np
+import logging
+logger = logging.getLogger("CustomLogger")
+
+
+class SyllableTable:
+    """
+    Precompiled syllable and stress lookup built from the CMU dictionary.
+
+    Words are kept in a sorted string array next to an (n, 3) integer array of
+    (max syllables, primary stresses, secondary stresses), with stresses
+    summed over all pronunciations as `count_syllables` does. Lookups are a
+    vectorized binary search. Saved tables can be memory-mapped.
+    """
+    WORDS_FILE = "syllable_words.npy"
+    VALUES_FILE = "syllable_values.npy"
+    UNKNOWN = (1, 0, 0)  # Unknown words: 1 syllable, no stress info
+
+    def __init__(self, words, values):
+        self.words = words
+        self.values = values
+
+    @classmethod
+    def build(cls, cmu_dict):
+        """
+        Compiles the table from a {word: [pronunciations]} dictionary.
+        """
+        words = sorted(cmu_dict)
+        values = np.zeros((len(words), 3), dtype=np.int64)
+
+        for i, word in enumerate(words):
+            syllable_counts = []
+            for pronunciation in cmu_dict[word]:
+                syllables = [p for p in pronunciation if p[-1].isdigit()]
+                syllable_counts.append(len(syllables))
+                values[i, 1] += sum(1 for p in syllables if "1" in p)
+                values[i, 2] += sum(1 for p in syllables if "2" in p)
+            values[i, 0] = max(syllable_counts) if syllable_counts else 0
+
+        dtype = np.uint8 if values.max(initial=0) <= np.iinfo(np.uint8).max else np.uint16
+        return cls(np.array(words), values.astype(dtype))
+
+    @classmethod
+    def load_or_build(cls, get_cmu_dict, table_dir=None):
+        """
+        Memory-maps a saved table from `table_dir`, building and saving it if missing.
+
+        Args:
+            get_cmu_dict (callable): Returns the CMU dictionary if the table must be built.
+            table_dir (str): Directory of the saved table, or None to keep it in memory.
+        """
+        if table_dir:
+            words_path = os.path.join(table_dir, cls.WORDS_FILE)
+            values_path = os.path.join(table_dir, cls.VALUES_FILE)
+            if os.path.exists(words_path) and os.path.exists(values_path):
+                try:
+                    return cls(np.load(words_path, mmap_mode="r"), np.load(values_path, mmap_mode="r"))
+                except Exception as e:
+                    logger.warning(f"Rebuilding unreadable syllable table in {table_dir}: {e}")
+
+        table = cls.build(get_cmu_dict())
+        if table_dir:
+            table.save(table_dir)
+        return table
+
+    def save(self, table_dir):
+        os.makedirs(table_dir, exist_ok=True)
+        for file_name, array in [(self.WORDS_FILE, self.words), (self.VALUES_FILE, self.values)]:
+            tmp_path = os.path.join(table_dir, f"{os.getpid()}.{file_name}")
+            np.save(tmp_path, array)
+            os.replace(tmp_path, os.path.join(table_dir, file_name))
+        logger.info(f"Saved syllable table for {len(self.words)} words to {table_dir}")
+
+    def lookup(self, words):
+        """
+        Returns (syllables, primary stresses, secondary stresses) for each word.
+
+        Args:
+            words (list of str): Lowercased words.
+
+        Returns:
+            np.ndarray: int64 array of shape (len(words), 3).
+        """
+        out = np.tile(np.array(self.UNKNOWN, dtype=np.int64), (len(words), 1))
+        if not words or not len(self.words):
+            return out
+
+        query = np.array(words)
+        idx = np.searchsorted(self.words, query)
+        idx[idx == len(self.words)] = 0
+        found = self.words[idx] == query
+        out[found] = self.values[idx[found]]
+        return out
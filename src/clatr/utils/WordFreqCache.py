@@ -0,0 +1,95 @@
+import os
+import json
+import logging
+logger = logging.getLogger("CustomLogger")
+
+
+class WordFreqCache:
+    """
+    Process-wide memo of wordfreq lookups.
+
+    Each word type is looked up once per process with `word_frequency` and
+    `zipf_frequency`, however many documents, sentences and text variants it
+    occurs in. With `cache_path`, the (frequency, zipf) pairs are loaded from
+    and saved to a JSON file, tagged with the wordfreq version, language and
+    wordlist so a stale cache is ignored.
+    """
+    _instance = None
+    _initialized = False
+
+    def __new__(cls, cache_path=None, lang="en", wordlist="best"):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+        return cls._instance
+
+    def __init__(self, cache_path=None, lang="en", wordlist="best"):
+        if self._initialized:
+            return
+
+        self.cache_path = cache_path
+        self.lang = lang
+        self.wordlist = wordlist
+        self.freqs = {}  # word: (frequency, zipf frequency)
+        self._num_loaded = 0
+        if cache_path and os.path.exists(cache_path):
+            self.freqs.update(self._read(cache_path))
+            self._num_loaded = len(self.freqs)
+            logger.info(f"Loaded {self._num_loaded} word frequencies from {cache_path}")
+
+        self._initialized = True
+
+    def _settings(self):
+        from importlib.metadata import version
+        return {"wordfreq": version("wordfreq"), "lang": self.lang, "wordlist": self.wordlist}
+
+    def lookup(self, words):
+        """
+        Returns (frequency, zipf frequency) for each word, looking up unseen words.
+
+        Args:
+            words (iterable of str): Words, typically the distinct words of a text.
+
+        Returns:
+            list of tuple: (frequency, zipf frequency) per word, in the order given.
+        """
+        from wordfreq import word_frequency, zipf_frequency
+
+        results = []
+        for word in words:
+            freq = self.freqs.get(word)
+            if freq is None:
+                freq = (word_frequency(word, self.lang, wordlist=self.wordlist),
+                        zipf_frequency(word, self.lang, wordlist=self.wordlist))
+                self.freqs[word] = freq
+            results.append(freq)
+        return results
+
+    def _read(self, path):
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("settings") != self._settings():
+                logger.info(f"Ignoring word frequency cache {path} built with other settings.")
+                return {}
+            return {word: tuple(freq) for word, freq in data["words"].items()}
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable word frequency cache {path}: {e}")
+            return {}
+
+    def save(self):
+        """
+        Writes the word frequencies to `cache_path`, merged with what is already there.
+        """
+        if not self.cache_path or len(self.freqs) == self._num_loaded:
+            return
+
+        freqs = self._read(self.cache_path) if os.path.exists(self.cache_path) else {}
+        freqs.update(self.freqs)
+
+        os.makedirs(os.path.dirname(self.cache_path) or ".", exist_ok=True)
+        tmp_path = f"{self.cache_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"settings": self._settings(), "words": freqs}, f)
+        os.replace(tmp_path, self.cache_path)
+        self._num_loaded = len(self.freqs)
+        logger.info(f"Saved {len(freqs)} word frequencies to {self.cache_path}")
@@ -0,0 +1,127 @@
+import os
+import sys
+import time
+import functools
+import numpy as np
+try:
+    import resource
+except ImportError:  # pragma: no cover - not available on Windows
+    resource = None
+
+# Per-document metric timings in this process: func name -> [wall_s, cpu_s, calls]
+_metric_timings = {}
+
+
+def profiled(func):
+    """
+    Decorator that accumulates wall and CPU time of a metric function.
+
+    Timings add up per function name until collected with `pop_metric_timings`,
+    which `PipelineManager.run_section` does once per document.
+    """
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            entry = _metric_timings.setdefault(func.__name__, [0.0, 0.0, 0])
+            entry[0] += time.perf_counter() - wall_start
+            entry[1] += time.process_time() - cpu_start
+            entry[2] += 1
+    return wrapper
+
+def pop_metric_timings():
+    """
+    Returns and resets the metric timings accumulated since the last call.
+
+    Returns:
+        dict: {f"{func}_wall_s": ..., f"{func}_cpu_s": ..., f"{func}_calls": ...}
+    """
+    flat = {}
+    for name, (wall, cpu, calls) in _metric_timings.items():
+        flat[f"{name}_wall_s"] = wall
+        flat[f"{name}_cpu_s"] = cpu
+        flat[f"{name}_calls"] = calls
+    _metric_timings.clear()
+    return flat
+
+def rss_mb():
+    """
+    Returns the current resident set size of this process in MB, or None where
+    /proc/self/statm is not available.
+    """
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+    except (OSError, ValueError, IndexError):
+        return None
+    return pages * os.sysconf("SC_PAGE_SIZE") / 1024 ** 2
+
+def process_peak_rss_mb():
+    """
+    Returns the peak resident set size of this process so far, in MB.
+
+    This is the process-lifetime high-water mark: once the largest document has
+    run, every later call returns the same value.
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and kilobytes elsewhere.
+    return peak / 1024 ** 2 if sys.platform == "darwin" else peak / 1024
+
+def count_tokens(sample_data):
+    """
+    Counts whitespace tokens of the cleaned text in a document's sample data.
+    """
+    records = sample_data if isinstance(sample_data, list) else [sample_data]
+    return sum(len(str(r.get("cleaned", "") or "").split()) for r in records)
+
+def summarize_timings(timings):
+    """
+    Summarizes per-document timings by section.
+
+    Args:
+        timings (list of dict): Rows recorded by `PipelineManager.run_section`.
+
+    Returns:
+        list of dict: One row per section with throughput and latency percentiles.
+            Throughput is per worker, as it is based on summed document wall time.
+            max_rss_mb and max_rss_delta_mb are the largest per-document resident
+            size and growth after the section ran; process_peak_rss_mb is the
+            high-water mark of the processes, not of any one document.
+    """
+    sections = {}
+    for row in timings:
+        sections.setdefault(row["section"], []).append(row)
+
+    summary = []
+    for section, rows in sections.items():
+        walls = np.array([r["wall_s"] for r in rows])
+        cpus = np.array([r["cpu_s"] for r in rows])
+        tokens = sum(r["num_tokens"] for r in rows)
+        total_wall = float(walls.sum())
+        rss = [r["rss_mb"] for r in rows if r.get("rss_mb") is not None]
+        rss_deltas = [r["rss_delta_mb"] for r in rows if r.get("rss_delta_mb") is not None]
+        peaks = [r["process_peak_rss_mb"] for r in rows if r.get("process_peak_rss_mb") is not None]
+
+        summary.append({
+            "section": section,
+            "num_docs": len(rows),
+            "num_cached_docs": sum(1 for r in rows if r.get("cached")),
+            "num_tokens": tokens,
+            "total_wall_s": total_wall,
+            "total_cpu_s": float(cpus.sum()),
+            "docs_per_sec": len(rows) / total_wall if total_wall > 0 else None,
+            "tokens_per_sec": tokens / total_wall if total_wall > 0 else None,
+            "p50_wall_s": float(np.percentile(walls, 50)),
+            "p95_wall_s": float(np.percentile(walls, 95)),
+            "max_wall_s": float(walls.max()),
+            "max_rss_mb": max(rss) if rss else None,
+            "max_rss_delta_mb": max(rss_deltas) if rss_deltas else None,
+            "process_peak_rss_mb": max(peaks) if peaks else None,
+        })
+
+    return summary
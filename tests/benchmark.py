@@ -0,0 +1,282 @@
+"""
+Benchmark suite for the CLATR analysis entry points.
+
+Builds deterministic synthetic documents of controlled length and times each
+`analyze_*` function (plus `compute_ngrams`) separately, writing the results
+to JSON so runs on different commits can be compared:
+
+    python -m tests.benchmark --out bench.json
+    python -m tests.benchmark --out bench_new.json --compare bench.json
+
+Every analysis is timed with an empty parsed-document store, so its own spaCy
+parse is included. When no Java runtime is available, LanguageTool is replaced
+by a small local checker so the mechanics section can still be timed.
+"""
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import argparse
+import platform
+import statistics
+import subprocess
+import tempfile
+from types import SimpleNamespace
+
+SECTIONS = ["graphemes", "lexicon", "morphology", "syntax", "phonology", "semantics", "mechanics"]
+
+# (num_tokens, num_sents) pairs from a one-line utterance to a long transcript.
+DEFAULT_SIZES = [(10, 1), (100, 8), (500, 40), (1000, 80), (5000, 300)]
+
+WORDS = {
+    "DET": ["the", "a", "this", "that", "every", "some"],
+    "ADJ": ["old", "small", "bright", "quiet", "broken", "happy", "green", "heavy"],
+    "NOUN": ["cat", "window", "umbrella", "grandfather", "tree", "ball", "kitchen",
+             "boy", "girl", "dog", "car", "street", "cake", "party", "ladder"],
+    "VERB": ["sees", "climbs", "breaks", "finds", "carries", "watches", "opens", "wants"],
+    "ADP": ["on", "under", "near", "behind", "into", "with"],
+    "CCONJ": ["and", "but", "so"],
+    "PRON": ["he", "she", "they", "it"],
+    "ADV": ["quickly", "slowly", "again", "finally", "there"],
+}
+PATTERN = ["DET", "ADJ", "NOUN", "VERB", "DET", "NOUN", "ADP", "DET", "NOUN",
+           "CCONJ", "PRON", "VERB", "ADV"]
+FUNCTION_POS = {"DET", "ADP", "CCONJ", "PRON"}
+
+
+def make_sentences(num_tokens, num_sents, seed=0):
+    """
+    Builds `num_sents` sentences with `num_tokens` words in total.
+
+    Returns:
+        list of tuple: (cleaned, semantic) text per sentence.
+    """
+    rng = random.Random(seed)
+    num_sents = max(1, min(num_sents, num_tokens))
+    base, extra = divmod(num_tokens, num_sents)
+    sentences = []
+
+    for s in range(num_sents):
+        length = base + (1 if s < extra else 0)
+        words, content = [], []
+        for i in range(length):
+            pos = PATTERN[i % len(PATTERN)]
+            word = rng.choice(WORDS[pos])
+            words.append(word)
+            if pos not in FUNCTION_POS:
+                content.append(word)
+        words[0] = words[0].capitalize()
+        sentences.append((" ".join(words) + ".", " ".join(content)))
+
+    return sentences
+
+def make_sample_data(doc_id, num_tokens, num_sents, sentence_level, seed=0):
+    """
+    Builds sample data shaped like the preprocessing fact tables.
+    """
+    sentences = make_sentences(num_tokens, num_sents, seed)
+    if sentence_level:
+        return [{"doc_id": doc_id, "sent_id": i + 1, "cleaned": c, "semantic": s, "cleaned_phon": ""}
+                for i, (c, s) in enumerate(sentences)]
+    return {
+        "doc_id": doc_id,
+        "cleaned": " ".join(c for c, _ in sentences),
+        "semantic": ". ".join(s for _, s in sentences),
+        "cleaned_phon": "",
+    }
+
+
+class LocalMatch:
+    """Minimal stand-in for a language_tool_python Match."""
+    def __init__(self, rule_id, category, offset, length):
+        self.ruleId = rule_id
+        self.category = category
+        self.offset = offset
+        self.errorLength = length
+
+
+class LocalGrammarChecker:
+    """
+    Stand-in for language_tool_python.LanguageTool when Java is unavailable.
+
+    Flags repeated words and lowercase sentence starts, which is enough to
+    exercise the mechanics section's bookkeeping.
+    """
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def check(self, text):
+        matches = []
+        offset = 0
+        prev = None
+        for i, word in enumerate(text.split(" ")):
+            if word and prev is not None and word.lower() == prev.lower():
+                matches.append(LocalMatch("ENGLISH_WORD_REPEAT_RULE", "MISC", offset, len(word)))
+            sent_start = i == 0 or (prev is not None and prev[-1:] in ".!?")
+            if sent_start and word[:1].islower():
+                matches.append(LocalMatch("UPPERCASE_SENTENCE_START", "CASING", offset, len(word)))
+            prev = word
+            offset += len(word) + 1
+        return matches
+
+    def close(self):
+        pass
+
+
+def make_pipeline(sentence_level, ngrams, output_dir):
+    """
+    Builds a PipelineManager with every section enabled and no I/O side effects.
+    """
+    from clatr.utils.PipelineManager import PipelineManager
+
+    config = {
+        "sentence_level": sentence_level, "ngrams": ngrams, "dep_trees": False,
+        "workers": 1, "result_cache": False, "checkpoint": False, "timings": False,
+    }
+    # Only the attributes PipelineManager reads are needed; no tables are written.
+    OM = SimpleNamespace(config=config, sections={s: True for s in SECTIONS},
+                         visualize=False, output_dir=output_dir, tables={})
+
+    PipelineManager._instance = None  # Allow one pipeline per granularity.
+    return PipelineManager(OM)
+
+def time_call(func, repeats):
+    walls, cpus, result = [], [], None
+    for _ in range(repeats):
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+        result = func()
+        walls.append(time.perf_counter() - wall_start)
+        cpus.append(time.process_time() - cpu_start)
+    return walls, cpus, result
+
+def run_benchmarks(sizes, repeats, functions, granularities, ngrams, seed):
+    from clatr.analyses.ngrams import compute_ngrams
+
+    results = []
+    output_dir = tempfile.mkdtemp(prefix="clatr_bench_")
+    try:
+        for gran in granularities:
+            PM = make_pipeline(gran == "sent", ngrams, output_dir)
+
+            for num_tokens, num_sents in sizes:
+                sample_data = make_sample_data(0, num_tokens, num_sents, gran == "sent", seed)
+
+                for name in functions:
+                    if name == "compute_ngrams":
+                        tokens = " ".join(c for c, _ in make_sentences(num_tokens, num_sents, seed)).split()
+
+                        def call():
+                            PM.ngram_id_doc = PM.ngram_id_sent = 1
+                            return compute_ngrams(PM, tokens, {"doc_id": 0}, "lex", "doc")
+                    else:
+                        section = name.replace("analyze_", "")
+
+                        def call(section=section):
+                            PM.release_docs()
+                            PM.ngram_id_doc = PM.ngram_id_sent = 1
+                            return PM.sections[section].func(PM, sample_data)
+
+                    walls, cpus, out = time_call(call, repeats)
+                    wall = statistics.median(walls)
+                    row = {
+                        "function": name,
+                        "granularity": gran,
+                        "num_tokens": num_tokens,
+                        "num_sents": num_sents,
+                        "repeats": repeats,
+                        "wall_s_min": min(walls),
+                        "wall_s_median": wall,
+                        "cpu_s_median": statistics.median(cpus),
+                        "tokens_per_sec": num_tokens / wall if wall > 0 else None,
+                        "returned_output": bool(out),
+                    }
+                    results.append(row)
+                    print(f"{name:20s} {gran:4s} {num_tokens:5d} tokens {num_sents:3d} sents "
+                          f"{wall * 1000:10.2f} ms", flush=True)
+
+            PM.close()
+    finally:
+        shutil.rmtree(output_dir, ignore_errors=True)
+
+    return results
+
+def environment_info(use_local_checker):
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        commit = None
+    try:
+        from clatr import __version__
+    except ImportError:
+        __version__ = None
+
+    return {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "commit": commit,
+        "clatr": __version__,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "language_tool": "local stand-in" if use_local_checker else "language_tool_python",
+    }
+
+def compare(results, baseline_path):
+    """
+    Prints the median wall-time ratio of each benchmark against a previous run.
+    """
+    with open(baseline_path, "r") as f:
+        baseline = json.load(f)
+
+    def key(r):
+        return (r["function"], r["granularity"], r["num_tokens"], r["num_sents"])
+
+    old = {key(r): r for r in baseline.get("results", [])}
+    print(f"\nComparison against {baseline_path} (commit {baseline.get('meta', {}).get('commit')}):")
+    for r in results:
+        prev = old.get(key(r))
+        if prev is None or not r["wall_s_median"]:
+            continue
+        speedup = prev["wall_s_median"] / r["wall_s_median"]
+        print(f"{r['function']:20s} {r['granularity']:4s} {r['num_tokens']:5d} tokens "
+              f"{prev['wall_s_median'] * 1000:10.2f} -> {r['wall_s_median'] * 1000:10.2f} ms ({speedup:.2f}x)")
+
+def parse_size(text):
+    tokens, sents = text.split("x")
+    return int(tokens), int(sents)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark CLATR analysis entry points.")
+    parser.add_argument("--out", default="bench_output.json", help="JSON file to write.")
+    parser.add_argument("--sizes", nargs="+", type=parse_size, default=DEFAULT_SIZES,
+                        help="Document sizes as TOKENSxSENTS, e.g. 100x8 5000x300.")
+    parser.add_argument("--functions", nargs="+",
+                        default=[f"analyze_{s}" for s in SECTIONS] + ["compute_ngrams"])
+    parser.add_argument("--granularities", nargs="+", choices=["doc", "sent"], default=["doc"])
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--ngrams", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--compare", default=None, help="Earlier benchmark JSON to compare against.")
+    args = parser.parse_args(argv)
+
+    use_local_checker = shutil.which("java") is None
+    if use_local_checker and "analyze_mechanics" in args.functions:
+        import language_tool_python
+        language_tool_python.LanguageTool = LocalGrammarChecker
+        print("No Java runtime found - using the local LanguageTool stand-in.")
+
+    results = run_benchmarks(args.sizes, args.repeats, args.functions,
+                             args.granularities, args.ngrams, args.seed)
+
+    with open(args.out, "w") as f:
+        json.dump({"meta": environment_info(use_local_checker), "results": results}, f, indent=2)
+    print(f"Wrote {len(results)} results to {args.out}")
+
+    if args.compare:
+        compare(results, args.compare)
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,149 @@
+import re
+import shutil
+from collections import Counter
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("infoscopy")
+spacy = pytest.importorskip("spacy")
+from spacy.tokens import Doc
+
+from clatr.analyses.mechanics import apply_language_tool, chunk_sentences
+
+
+class ParagraphTool:
+    """
+    Stand-in for LanguageToolPool with LanguageTool's paragraph behaviour.
+
+    Sentence-start and paragraph-end rules apply per paragraph, the word
+    repeat rule runs over the whole text (so it can span a paragraph break),
+    and a text-level rule compares consecutive paragraphs.
+    """
+    def __init__(self):
+        self.texts = []
+
+    @staticmethod
+    def match(rule, category, offset, length):
+        return SimpleNamespace(ruleId=rule, category=category, offset=offset, errorLength=length)
+
+    def check(self, text):
+        matches = []
+        paragraphs = [(m.start(), m.group()) for m in re.finditer(r"[^\n]+", text)]
+        previous_first = None
+        for start, para in paragraphs:
+            first = re.match(r"\w+", para)
+            if first and para[0].islower():
+                matches.append(self.match("UPPERCASE_SENTENCE_START", "CASING", start, first.end()))
+            if first and previous_first == first.group().lower():
+                matches.append(self.match("PARAGRAPH_REPEAT_BEGINNING_RULE", "STYLE", start, first.end()))
+            previous_first = first.group().lower() if first else None
+            if not para.rstrip().endswith((".", "!", "?")):
+                last = list(re.finditer(r"\w+", para))[-1]
+                matches.append(self.match("PUNCTUATION_PARAGRAPH_END", "PUNCTUATION",
+                                          start + last.start(), len(last.group())))
+        for m in re.finditer(r"\b(\w+)(\s+)\1\b", text, flags=re.IGNORECASE):
+            matches.append(self.match("ENGLISH_WORD_REPEAT_RULE", "MISC", m.start(), len(m.group())))
+        return matches
+
+    def check_all(self, texts):
+        self.texts.extend(texts)
+        return [self.check(text) for text in texts]
+
+
+def make_doc(sentences):
+    nlp = spacy.blank("en")
+    words, sent_starts = [], []
+    for sent in sentences:
+        tokens = sent.split()
+        words.extend(tokens)
+        sent_starts.extend([True] + [False] * (len(tokens) - 1))
+    return Doc(nlp.vocab, words=words, sent_starts=sent_starts)
+
+
+def per_sentence_counts(doc, tool):
+    """The original path: every sentence checked on its own."""
+    rules, cats, num_matches, error_lengths = Counter(), Counter(), [], []
+    for sent in doc.sents:
+        matches = tool.check(sent.text)
+        if matches:
+            num_matches.append(len(matches))
+            for m in matches:
+                rules[m.ruleId] += 1
+                cats[m.category] += 1
+                error_lengths.append(m.errorLength)
+    return rules, cats, num_matches, error_lengths
+
+
+SENTENCES = [
+    "so we went to the the store",
+    "so then we we came home .",
+    "Then it rained",
+    "then it it stopped .",
+    "we had fun fun",
+    "fun was had by all",
+    "And that was that !",
+]
+
+
+@pytest.mark.parametrize("max_chars", [0, 30, 60, 20000])
+def test_chunked_counts_match_per_sentence_checks(max_chars):
+    doc = make_doc(SENTENCES)
+    tool = ParagraphTool()
+    results = apply_language_tool(doc, 5, tool, max_chars)
+
+    rules, cats, num_matches, error_lengths = per_sentence_counts(doc, ParagraphTool())
+    assert results["num_lgtool_errors"] == sum(num_matches)
+    assert results["num_sents_w_error"] == len(num_matches)
+    assert results["avg_errors_per_sent"] == pytest.approx(sum(num_matches) / len(num_matches))
+    assert results["total_error_length"] == sum(error_lengths)
+    assert {k: v for k, v in results.items() if k.startswith("num_error_")} == \
+        {f"num_error_{rule}": count for rule, count in rules.items()}
+    assert {k: v for k, v in results.items() if k.startswith("num_category_")} == \
+        {f"num_category_{cat}": count for cat, count in cats.items()}
+
+
+def test_chunks_batch_sentences():
+    doc = make_doc(SENTENCES)
+    tool = ParagraphTool()
+    apply_language_tool(doc, 5, tool, 20000)
+    assert len(tool.texts) == 1
+
+    tool = ParagraphTool()
+    apply_language_tool(doc, 5, tool, 0)
+    assert tool.texts == [sent.text for sent in doc.sents]
+
+
+def test_chunk_sentences_counts_separators():
+    assert chunk_sentences(["aaaa", "bbbb", "cc"], 10) == [(0, 2), (2, 3)]
+    assert chunk_sentences(["aaaa", "bbbb", "cc"], 0) == [(0, 1), (1, 2), (2, 3)]
+    assert chunk_sentences(["a" * 50, "b"], 10) == [(0, 1), (1, 2)]
+    assert chunk_sentences([], 10) == []
+
+
+TRANSCRIPT = [
+    "so the boy he he climbs up on the stool",
+    "then he reaches for the cookie jar .",
+    "then the stool starts to tip over",
+    "then the mother is washing dishes and the water is overflowing .",
+    "she dont notice the the water",
+    "And the girl is laughing !",
+]
+
+
+def test_chunked_counts_match_language_tool():
+    pytest.importorskip("language_tool_python")
+    if shutil.which("java") is None:
+        pytest.skip("LanguageTool needs Java")
+    from clatr.utils.LanguageToolPool import LanguageToolPool
+
+    doc = make_doc(TRANSCRIPT)
+    pool = LanguageToolPool(1)
+    try:
+        per_sentence = apply_language_tool(doc, 5, pool, 0)
+        chunked = apply_language_tool(doc, 5, pool, 20000)
+    finally:
+        pool.close()
+
+    assert per_sentence.get("num_lgtool_errors", 0) > 0
+    assert chunked == per_sentence
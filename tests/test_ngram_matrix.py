@@ -0,0 +1,20 @@
+import pytest
+
+pytest.importorskip("scipy")
+
+from clatr.analyses.ngrams import OTHER_NGRAM
+from clatr.data.ngram_matrix import NgramMatrix, load_ngram_matrix
+
+
+def test_matrix_round_trip_without_other_rows(tmp_path):
+    matrix = NgramMatrix("lex_n1grams_doc")
+    matrix.add([{"doc_id": "a", "ngram": "the", "proportion": 0.5},
+                {"doc_id": "a", "ngram": "cat", "proportion": 0.25},
+                {"doc_id": "a", "ngram": OTHER_NGRAM, "proportion": 0.25}])
+    matrix.add([{"doc_id": "b", "ngram": "cat", "proportion": 1.0}])
+    matrix.save(str(tmp_path))
+
+    csr, ngrams, rows = load_ngram_matrix(str(tmp_path), "lex_n1grams_doc")
+    assert ngrams == ["the", "cat"]
+    assert rows == [{"doc_id": "a"}, {"doc_id": "b"}]
+    assert csr.toarray().tolist() == [[0.5, 0.25], [0.0, 1.0]]
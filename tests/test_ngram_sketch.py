@@ -0,0 +1,59 @@
+from collections import Counter
+
+import numpy as np
+import pytest
+
+from clatr.analyses.ngrams import OTHER_NGRAM
+from clatr.utils.NgramSketch import NgramSketch
+
+TABLE = "lex_n1grams"
+
+
+def random_docs(seed, num_docs=30, vocab=40):
+    rng = np.random.default_rng(seed)
+    return [Counter(f"w{i}" for i in rng.zipf(1.5, size=int(rng.integers(5, 80))) % vocab)
+            for _ in range(num_docs)]
+
+
+def pruned_rows(counts, top_k, other_bucket):
+    """Document rows as compute_ngrams writes them with ngram_top_k."""
+    total = sum(counts.values())
+    ranked = counts.most_common()
+    rows = [{"ngram": ngram, "count": count, "proportion": count / total}
+            for ngram, count in ranked[:top_k]]
+    other = sum(count for _, count in ranked[top_k:])
+    if other_bucket and other:
+        rows.append({"ngram": OTHER_NGRAM, "count": other, "proportion": other / total})
+    return {f"{TABLE}_doc": rows}
+
+
+@pytest.mark.parametrize("capacity", [None, 5])
+@pytest.mark.parametrize("other_bucket", [False, True])
+def test_reloaded_pruned_rows_keep_upper_bounds(capacity, other_bucket):
+    docs = random_docs(0)
+    sketch = NgramSketch(capacity)
+    for i, counts in enumerate(docs):
+        if i % 2:
+            sketch.update_from_results(pruned_rows(counts, 3, other_bucket), "doc", OTHER_NGRAM)
+        else:
+            sketch.update(TABLE, list(counts), list(counts.values()))
+
+    true_counts = sum(docs, Counter())
+    assert sketch.totals[TABLE] == sum(true_counts.values())
+    rows = sketch.to_rows()
+    assert rows and not any(row["exact"] for row in rows)
+    for row in rows:
+        assert row["count"] >= true_counts[row["ngram"]]
+        assert row["count"] - row["max_error"] <= true_counts[row["ngram"]]
+
+
+def test_unpruned_reloaded_rows_stay_exact():
+    docs = random_docs(1)
+    sketch = NgramSketch()
+    for counts in docs:
+        sketch.update_from_results(pruned_rows(counts, None, True), "doc", OTHER_NGRAM)
+
+    true_counts = sum(docs, Counter())
+    rows = sketch.to_rows()
+    assert all(row["exact"] and row["max_error"] == 0 for row in rows)
+    assert {row["ngram"]: row["count"] for row in rows} == dict(true_counts)
@@ -0,0 +1,56 @@
+from collections import Counter
+
+import numpy as np
+import pytest
+
+from clatr.analyses.ngrams import count_ngram_orders, encode_sequence
+
+
+def counter_orders(sequence, max_n):
+    """N-gram counts per order from a Counter of tuples, in order of first occurrence."""
+    return {n: Counter(tuple(sequence[i:i + n]) for i in range(len(sequence) - n + 1))
+            for n in range(1, max_n + 1) if len(sequence) >= n}
+
+
+def encoded_orders(sequence, max_n):
+    ids, vocab_size = encode_sequence(sequence)
+    return {n: {tuple(sequence[start:start + n]): count
+                for start, count in zip(first_idx.tolist(), counts.tolist())}
+            for n, first_idx, counts in count_ngram_orders(ids, vocab_size, max_n)}
+
+
+def assert_matches_counter(sequence, max_n):
+    expected = counter_orders(sequence, max_n)
+    result = encoded_orders(sequence, max_n)
+    assert list(result) == list(expected)
+    for n in expected:
+        # Same n-grams, counts and first-occurrence order
+        assert list(result[n].items()) == list(expected[n].items())
+
+
+@pytest.mark.parametrize("sequence", [
+    list("the cat sat on the mat"),
+    "a b a b a b a".split(),
+    ["x"] * 7,
+    ["only"],
+    [],
+])
+def test_counts_match_counter(sequence):
+    assert_matches_counter(sequence, 5)
+
+
+def test_random_sequences_match_counter():
+    rng = np.random.default_rng(0)
+    for vocab in (2, 5, 40):
+        sequence = [f"w{i}" for i in rng.integers(vocab, size=300)]
+        assert_matches_counter(sequence, 6)
+
+
+def test_overflowing_keys_fall_back_to_windows():
+    # 3000 ** 6 exceeds int64, so orders 6 and up are counted as window rows
+    rng = np.random.default_rng(1)
+    vocab = [f"w{i}" for i in range(3000)]
+    sequence = vocab + [vocab[i] for i in rng.integers(3, size=500)]
+    ids, vocab_size = encode_sequence(sequence)
+    assert vocab_size ** 6 > np.iinfo(np.int64).max
+    assert_matches_counter(sequence, 7)
@@ -0,0 +1,68 @@
+import re
+from collections import Counter
+
+import pytest
+
+pytest.importorskip("infoscopy")
+spacy = pytest.importorskip("spacy")
+
+from clatr.analyses.phonology import PHONETIC_FEATURES_ARPABET, analyze_phonemes
+
+
+class FakeProns:
+    """Fixed pronunciations in place of PronunciationCache."""
+    PRONS = {
+        "the": ["DH", "AH0"],
+        "cat": ["K", "AE1", "T"],
+        "sat": ["S", "AE1", "T"],
+        "on": ["AA1", "N"],
+        "mat": ["M", "AE1", "T"],
+        "butter": ["B", "AH1", "DX", "ER0"],  # DX is not in the seeded inventory
+        "zyx": ["Z", "AX0", " ", "'"],  # a new stressed symbol, a space and a non-word symbol
+    }
+
+    def lookup(self, words):
+        return [self.PRONS[w] for w in words]
+
+
+def counter_phoneme_counts(phonemized_tokens):
+    """The original Counter-based phoneme and feature tallies."""
+    phoneme_list = [p for t in phonemized_tokens for p in t if p != ' ']
+    phoneme_counts = Counter(phoneme_list)
+
+    counts = {}
+    total_phoneme_counts = Counter()
+    for phoneme, count in phoneme_counts.items():
+        if re.match(r'^\w+$', phoneme):
+            counts[f"num_{phoneme}"] = count
+            if re.search(r'\d', phoneme):
+                total_phoneme_counts[re.sub(r'\d', '', phoneme)] += count
+    for phoneme, count in total_phoneme_counts.items():
+        counts[f"num_total_{phoneme}"] = count
+
+    feature_counts = {feature: 0 for feature in PHONETIC_FEATURES_ARPABET}
+    for phoneme, count in phoneme_counts.items():
+        for feature, members in PHONETIC_FEATURES_ARPABET.items():
+            if re.sub(r'\d', '', phoneme) in members:
+                feature_counts[feature] += count
+    return phoneme_list, phoneme_counts, counts, feature_counts
+
+
+@pytest.mark.parametrize("text", [
+    "the cat sat on the mat",
+    "butter zyx the butter cat zyx",
+    "mat",
+])
+def test_phoneme_counts_match_counter(text):
+    doc = spacy.blank("en")(text)
+    prons = FakeProns()
+    results = analyze_phonemes(doc, prons)
+
+    phonemized = prons.lookup([t.text.lower() for t in doc if t.is_alpha])
+    phoneme_list, phoneme_counts, counts, feature_counts = counter_phoneme_counts(phonemized)
+
+    # Same keys, in the same order, with the same values
+    assert list(results["phoneme_counts"].items()) == list(counts.items())
+    assert results["phon_feature_counts"] == {f"num_{f}": c for f, c in feature_counts.items()}
+    assert results["phoneme_basic_specs"]["total_phonemes"] == len(phoneme_list)
+    assert results["phoneme_basic_specs"]["unique_phoneme_count"] == len(phoneme_counts)
@@ -0,0 +1,71 @@
+import numpy as np
+import pytest
+
+spacy = pytest.importorskip("spacy")
+lexicalrichness = pytest.importorskip("lexicalrichness")
+from spacy.tokens import Doc
+
+from clatr.analyses import richness
+
+VOCAB = [a + b for a in "bcdfg" for b in "aeiou"]  # alphabetic word types
+
+
+def native_measures(tokens):
+    """The measures as compute_lexical_richness gets them, from a Doc of the tokens."""
+    ids, counts = richness.alpha_token_ids(Doc(spacy.blank("en").vocab, words=tokens))
+    n = len(ids)
+    return {
+        "msttr": lambda: richness.msttr(ids, min(25, n - 1)),
+        "mattr": lambda: richness.mattr(ids, min(25, n - 1)),
+        "mtld": lambda: richness.mtld(ids, threshold=0.72),
+        "hdd": lambda: richness.hdd(counts, draws=min(42, n)),
+        "yulek": lambda: richness.yule_k(counts),
+        "yulei": lambda: richness.yule_i(counts),
+        "herdanvm": lambda: richness.herdan_vm(counts),
+        "simpsond": lambda: richness.simpson_d(counts),
+        "vocd": lambda: richness.vocd(ids),
+    }
+
+
+def reference_measures(tokens):
+    lex = lexicalrichness.LexicalRichness(tokens, preprocessor=None, tokenizer=None)
+    n = len(tokens)
+    return {
+        "msttr": lambda: lex.msttr(segment_window=min(25, n - 1)),
+        "mattr": lambda: lex.mattr(window_size=min(25, n - 1)),
+        "mtld": lambda: lex.mtld(threshold=0.72),
+        "hdd": lambda: lex.hdd(draws=min(42, n)),
+        "yulek": lambda: lex.yulek,
+        "yulei": lambda: lex.yulei,
+        "herdanvm": lambda: lex.herdanvm,
+        "simpsond": lambda: lex.simpsond,
+        "vocd": lambda: lex.vocd(),
+    }
+
+
+def random_tokens(seed, size):
+    rng = np.random.default_rng(seed)
+    return [VOCAB[i] for i in (rng.zipf(1.6, size=size) - 1) % len(VOCAB)]
+
+
+@pytest.mark.parametrize("tokens", [
+    random_tokens(0, 300),
+    random_tokens(1, 1000),
+    ["cat", "dog"],
+    ["cat"] * 60,
+    [a + b + c for a in "bcd" for b in "aeiou" for c in "lmnrst"][:60],
+], ids=["zipf300", "zipf1000", "two", "identical", "distinct"])
+def test_measures_match_lexicalrichness(tokens):
+    native = native_measures(tokens)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        for name, reference in reference_measures(tokens).items():
+            try:
+                expected = float(reference())
+            except (ValueError, ZeroDivisionError):
+                with pytest.raises((ValueError, ZeroDivisionError)):
+                    native[name]()
+                continue
+
+            # vocd fits randomly drawn samples, drawn differently here
+            rel = 0.15 if name == "vocd" else 1e-9
+            assert native[name]() == pytest.approx(expected, rel=rel, abs=1e-12), name
@@ -0,0 +1,280 @@
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+pytest.importorskip("infoscopy")
+spacy = pytest.importorskip("spacy")
+from spacy.tokens import Doc
+from dendropy import Tree, TaxonNamespace
+from dendropy.calculate import treecompare
+from zss import simple_distance
+
+from clatr.analyses import syntax
+from clatr.analyses.syntax import analyze_syntactic_trees, compute_tree_height
+
+
+def loop_tree_metrics(doc):
+    """The original per-sentence, per-token loops."""
+    data = Counter()
+    tree_heights, depth_per_token, subject_distances = [], [], []
+    branch_counts = Counter()
+    total_children = total_nodes = 0
+    for sent in doc.sents:
+        data["num_root_tokens"] += 1
+        tree_heights.append(compute_tree_height(sent.root))
+        for token in sent:
+            depth = len(list(token.ancestors))
+            depth_per_token.append(depth)
+            if "subj" in token.dep_:
+                subject_distances.append(depth)
+            num_children = len(list(token.children))
+            if num_children > 0:
+                branch_counts[f"n{num_children}_branchings"] += 1
+                total_children += num_children
+                total_nodes += 1
+        data["num_NP"] += sum(1 for chunk in doc.noun_chunks if chunk.root in sent)
+        data["num_VP"] += sum(1 for token in sent if token.pos_ == "VERB" and token.dep_ == "ROOT")
+        data["num_PP"] += sum(1 for token in sent if token.pos_ == "ADP")
+        data["num_clauses"] += sum(1 for token in sent if token.dep_ in {"ccomp", "advcl", "acl", "relcl"})
+
+    data["max_tree_height"] = max(tree_heights)
+    data["min_tree_height"] = min(tree_heights)
+    data["avg_tree_height"] = np.mean(tree_heights)
+    data["mean_dependency_distance"] = np.mean([abs(t.i - t.head.i) for t in doc if t.head != t])
+    data["subj_to_root_distance_avg"] = np.mean(subject_distances) if subject_distances else 0
+    data["depth_per_token_avg"] = np.mean(depth_per_token)
+    data["avg_branching_factor"] = total_children / total_nodes if total_nodes else 0
+    data.update(branch_counts)
+    return dict(data)
+
+
+def make_doc(sentences):
+    """Builds a parsed Doc from (word, head offset in sentence, dep, pos) rows per sentence."""
+    words, heads, deps, pos = [], [], [], []
+    for sent in sentences:
+        start = len(words)
+        for word, head, dep, tag in sent:
+            words.append(word)
+            heads.append(start + head)
+            deps.append(dep)
+            pos.append(tag)
+    return Doc(spacy.blank("en").vocab, words=words, heads=heads, deps=deps, pos=pos)
+
+
+SENTENCES = [
+    [  # the big dog chased a cat into the garden
+        ("the", 2, "det", "DET"), ("big", 2, "amod", "ADJ"), ("dog", 3, "nsubj", "NOUN"),
+        ("chased", 3, "ROOT", "VERB"), ("a", 5, "det", "DET"), ("cat", 3, "dobj", "NOUN"),
+        ("into", 3, "prep", "ADP"), ("the", 8, "det", "DET"), ("garden", 6, "pobj", "NOUN"),
+    ],
+    [  # she said that he left
+        ("she", 1, "nsubj", "PRON"), ("said", 1, "ROOT", "VERB"), ("that", 4, "mark", "SCONJ"),
+        ("he", 4, "nsubj", "PRON"), ("left", 1, "ccomp", "VERB"),
+    ],
+    [  # rain
+        ("rain", 0, "ROOT", "NOUN"),
+    ],
+]
+
+
+def assert_matches_loops(doc):
+    results = analyze_syntactic_trees(doc)["syn_trees"]
+    for key, value in loop_tree_metrics(doc).items():
+        assert results[key] == pytest.approx(value), key
+
+
+def test_tree_metrics_match_token_loops():
+    doc = make_doc(SENTENCES)
+    assert analyze_syntactic_trees(doc)["syn_trees"]["num_NP"] == 6
+    assert_matches_loops(doc)
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_random_trees_match_token_loops(seed):
+    rng = np.random.default_rng(seed)
+    sentences = []
+    for _ in range(rng.integers(1, 6)):
+        n = int(rng.integers(1, 25))
+        root = int(rng.integers(n))
+        # Attach tokens in a random order, each to an already attached token
+        order = [root] + [i for i in rng.permutation(n).tolist() if i != root]
+        heads = {root: root}
+        for k, i in enumerate(order[1:], 1):
+            heads[i] = order[int(rng.integers(k))]
+        sentences.append([
+            ("w", heads[i], "ROOT" if i == root else str(rng.choice(["nsubj", "det", "dobj", "prep", "acl"])),
+             str(rng.choice(["NOUN", "VERB", "ADP", "DET"])))
+            for i in range(n)
+        ])
+    assert_matches_loops(make_doc(sentences))
+
+
+# Constituency parses of TREE_SENTENCES, as benepar's parse_string would give them
+PARSES = {
+    "the big dog chased a cat into the garden":
+        "(S (NP (DT the) (JJ big) (NN dog)) (VP (VBD chased) (NP (DT a) (NN cat)) (PP (IN into) (NP (DT the) (NN garden)))))",
+    "she said that he left": "(S (NP (PRP she)) (VP (VBD said) (SBAR (IN that) (S (NP (PRP he)) (VP (VBD left))))))",
+    "the cat slept": "(S (NP (DT the) (NN cat)) (VP (VBD slept)))",
+    "dogs bark loudly": "(S (NP (NNS dogs)) (VP (VBP bark) (ADVP (RB loudly))))",
+    "a dog chased the cat": "(S (NP (DT a) (NN dog)) (VP (VBD chased) (NP (DT the) (NN cat))))",
+    "rain": "(S (NP (NN rain)))",
+}
+
+TREE_SENTENCES = [
+    SENTENCES[0],
+    SENTENCES[1],
+    [("the", 1, "det", "DET"), ("cat", 2, "nsubj", "NOUN"), ("slept", 2, "ROOT", "VERB")],
+    [("dogs", 1, "nsubj", "NOUN"), ("bark", 1, "ROOT", "VERB"), ("loudly", 1, "advmod", "ADV")],
+    [("a", 1, "det", "DET"), ("dog", 2, "nsubj", "NOUN"), ("chased", 2, "ROOT", "VERB"),
+     ("the", 4, "det", "DET"), ("cat", 2, "dobj", "NOUN")],
+    SENTENCES[2],
+    [("the", 1, "det", "DET"), ("cat", 2, "nsubj", "NOUN"), ("slept", 2, "ROOT", "VERB")],
+]
+
+
+class FakeParser:
+    """Stands in for the benepar pipeline: nlp.pipe yields Docs with a parse_string."""
+    def __init__(self):
+        self.batches = []
+
+    def get_nlp(self):
+        return self
+
+    def pipe(self, texts, batch_size=64):
+        texts = list(texts)
+        self.batches.append((len(texts), batch_size))
+        for text in texts:
+            sent = SimpleNamespace(_=SimpleNamespace(parse_string=PARSES[" ".join(text.split())]))
+            yield SimpleNamespace(sents=iter([sent]))
+
+
+@pytest.fixture
+def tree_doc(monkeypatch):
+    parser = FakeParser()
+    monkeypatch.setattr(syntax, "NLPmodel", lambda: parser)
+    return make_doc(TREE_SENTENCES)
+
+
+def fresh_symmetric_difference(newick1, newick2):
+    """The original per-pair comparison, with a new TaxonNamespace for each pair."""
+    taxa = TaxonNamespace()
+    t1 = Tree.get(data=newick1, schema="newick", taxon_namespace=taxa, suppress_internal_node_taxa=True, suppress_leaf_node_taxa=False)
+    t2 = Tree.get(data=newick2, schema="newick", taxon_namespace=taxa, suppress_internal_node_taxa=True, suppress_leaf_node_taxa=False)
+    t1.encode_bipartitions()
+    t2.encode_bipartitions()
+    return treecompare.symmetric_difference(t1, t2)
+
+
+def test_shared_namespace_trees_match_fresh_pairs(tree_doc):
+    sents = list(tree_doc.sents)
+    newicks = syntax.sents_to_newick(sents, batch_size=2)
+    assert newicks == [syntax.parse_to_newick(PARSES[" ".join(sent.text.split())]) for sent in sents]
+
+    trees = syntax.build_constituency_trees(newicks)
+    for i in range(len(sents)):
+        for j in range(i + 1, len(sents)):
+            expected = fresh_symmetric_difference(newicks[i], newicks[j])
+            assert treecompare.symmetric_difference(trees[i], trees[j]) == expected, (i, j)
+            assert syntax.run_treecompare(sents[i], sents[j]) == expected, (i, j)
+
+
+def pair_loop_matrices(sents, newicks):
+    """The original all-pairs loop: (dependency TED, constituency SD) matrices."""
+    n = len(sents)
+    ted, sd = np.zeros((n, n)), np.zeros((n, n))
+    for i in range(n):
+        for j in range(i + 1, n):
+            ted[i, j] = ted[j, i] = simple_distance(syntax.spacy_to_zss_tree(sents[i].root),
+                                                    syntax.spacy_to_zss_tree(sents[j].root))
+            sd[i, j] = sd[j, i] = fresh_symmetric_difference(newicks[i], newicks[j])
+    return ted, sd
+
+
+def distance_stats(values, sents):
+    """The original summary statistics over non-zero distances."""
+    weights = np.array([len(sent) for sent in sents])[:len(values)]
+    if len(weights) != len(values):
+        weights = np.ones_like(values)
+    return {
+        "min": np.min(values), "max": np.max(values), "mean": np.mean(values),
+        "median": np.median(values), "var": np.var(values), "std_dev": np.std(values),
+        "cv": np.std(values) / np.mean(values),
+        "weighted_mean_dist": np.average(values, weights=weights),
+        "normalized_diversity": np.mean(values) / np.mean(weights),
+    }
+
+
+def assert_stats(results, lab, values, sents):
+    for key, value in distance_stats(values, sents).items():
+        assert results[f"{lab}_{key}"] == pytest.approx(value), f"{lab}_{key}"
+
+
+def test_compare_trees_matches_pair_loop(tree_doc):
+    sents = list(tree_doc.sents)
+    newicks = syntax.sents_to_newick(sents)
+    ted, sd = pair_loop_matrices(sents, newicks)
+
+    results = syntax.compare_trees(tree_doc)["tree_comp"]
+    assert (results["total_sents"], results["total_pairs"], results["pairs_compared"]) == (7, 21, 21)
+    assert results["pair_sampling"] == "all"
+    for lab, mat in [("dep_zss", ted), ("tree_zss", ted), ("tree_sdmat", sd)]:
+        assert_stats(results, lab, mat[np.nonzero(mat)], sents)
+
+    rows, cols, _ = syntax.select_tree_pairs(len(sents))
+    zss_trees, _ = syntax.build_sentence_trees(sents)
+    dep_ted, tree_sd = syntax.pairwise_tree_distances(zss_trees, newicks, rows, cols)
+    assert dep_ted.tolist() == ted[rows, cols].tolist()
+    assert tree_sd.tolist() == sd[rows, cols].tolist()
+    # Same values, in the same order, as indexing the full matrix
+    assert syntax.full_matrix_nonzero(dep_ted, len(sents)).tolist() == ted[np.nonzero(ted)].tolist()
+
+
+@pytest.mark.parametrize("n,max_pairs", [(7, 8), (50, 300), (200, 1)])
+def test_pair_sample_is_seeded_and_unique(n, max_pairs):
+    rows, cols, sampling = syntax.select_tree_pairs(n, max_pairs, seed=3)
+    again = syntax.select_tree_pairs(n, max_pairs, seed=3)
+    assert sampling == "random"
+    assert rows.tolist() == again[0].tolist() and cols.tolist() == again[1].tolist()
+    assert len(set(zip(rows.tolist(), cols.tolist()))) == len(rows) == max_pairs
+    assert np.all(rows < cols) and np.all(cols < n)
+
+    # The sample is a seeded pick of row-major upper-triangle pairs
+    picks = np.sort(np.random.default_rng(3).choice(n * (n - 1) // 2, size=max_pairs, replace=False))
+    all_rows, all_cols = np.triu_indices(n, 1)
+    assert rows.tolist() == all_rows[picks].tolist()
+    assert cols.tolist() == all_cols[picks].tolist()
+
+
+def test_sampled_compare_trees_reports_pairs(tree_doc):
+    sents = list(tree_doc.sents)
+    ted, sd = pair_loop_matrices(sents, syntax.sents_to_newick(sents))
+
+    results = syntax.compare_trees(tree_doc, max_pairs=8, seed=3)["tree_comp"]
+    assert results == syntax.compare_trees(tree_doc, max_pairs=8, seed=3)["tree_comp"]
+    assert (results["total_pairs"], results["pairs_compared"], results["pair_sampling"]) == (21, 8, "random")
+
+    rows, cols, _ = syntax.select_tree_pairs(len(sents), 8, seed=3)
+    for lab, mat in [("dep_zss", ted), ("tree_sdmat", sd)]:
+        values = mat[rows, cols]
+        assert_stats(results, lab, values[values != 0], sents)
+
+    uncapped = syntax.compare_trees(tree_doc, max_pairs=21)["tree_comp"]
+    assert (uncapped["pairs_compared"], uncapped["pair_sampling"]) == (21, "all")
+
+
+def test_pool_chunks_match_serial(tree_doc):
+    sents = list(tree_doc.sents)
+    newicks = syntax.sents_to_newick(sents)
+    zss_trees, _ = syntax.build_sentence_trees(sents)
+    rows, cols, _ = syntax.select_tree_pairs(len(sents))
+    serial = syntax.pairwise_tree_distances(zss_trees, newicks, rows, cols)
+
+    with ProcessPoolExecutor(max_workers=2) as pool:
+        pooled = syntax.pairwise_tree_distances(zss_trees, newicks, rows, cols, pool=pool, num_chunks=4)
+        pooled_results = syntax.compare_trees(tree_doc, pool=pool, num_chunks=4)
+    assert pooled[0].tolist() == serial[0].tolist()
+    assert pooled[1].tolist() == serial[1].tolist()
+    assert pooled_results == syntax.compare_trees(tree_doc)